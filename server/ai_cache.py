@@ -0,0 +1,31 @@
+# server/ai_cache.py
+# Response cache for /ai/chat.
+#
+# Most chat traffic is a handful of repeated questions ("uses of tulsi") and the
+# templated per-plant prompt built by PlantDetail.jsx, so answers are cached on the
+# normalized prompt and identical concurrent questions share one Gemini call.
+import hashlib
+import os
+import re
+
+from .cache import SingleFlightCache
+
+chat_response_cache = SingleFlightCache(
+    "ai_chat",
+    maxsize=int(os.getenv("AI_CHAT_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("AI_CHAT_CACHE_TTL_SECONDS", "3600")),
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(message: str) -> str:
+    # "  Uses of TULSI? " and "uses of tulsi" are the same question
+    return _WHITESPACE.sub(" ", message).strip().lower().rstrip("?!. ")
+
+
+def chat_cache_key(model_name: str, system_instruction: str, message: str) -> tuple:
+    # The model and system instruction are part of the key so changing either one
+    # never serves answers generated under the old setup.
+    setup = hashlib.sha256(f"{model_name}\n{system_instruction}".encode()).hexdigest()[:16]
+    return setup, normalize_prompt(message)
@@ -0,0 +1,320 @@
+# server/ai_client.py
+# Shared Gemini client: model reuse, concurrency limit, timeouts, retries, circuit breaker.
+#
+# Every upstream call goes through generate_content() / stream_content():
+#   1. circuit breaker  - after repeated upstream failures, fail fast (503) for a cooldown
+#   2. limiter          - at most AI_MAX_CONCURRENCY calls in flight, at most AI_MAX_QUEUE
+#                         waiting; beyond that, fail fast (429) instead of piling up
+#   3. timeout          - each attempt is bounded by AI_CALL_TIMEOUT_SECONDS (504)
+#   4. retry            - transient errors are retried with jittered exponential backoff
+# so a slow or degraded Gemini cannot consume unbounded coroutines, sockets or latency.
+# The Gemini SDK (about a second to import) is loaded and configured on the first call.
+import asyncio
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+
+from .config import get_settings
+from .metrics import ai_latency, timed
+
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "64"))
+AI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "10"))
+AI_CALL_TIMEOUT_SECONDS = float(os.getenv("AI_CALL_TIMEOUT_SECONDS", "30"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BASE_SECONDS = float(os.getenv("AI_RETRY_BASE_SECONDS", "0.5"))
+AI_RETRY_MAX_SECONDS = float(os.getenv("AI_RETRY_MAX_SECONDS", "4"))
+AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5"))
+AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+
+
+@lru_cache(maxsize=1)
+def transient_errors() -> tuple:
+    # Errors worth retrying: upstream overload, transient server errors and timeouts
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        asyncio.TimeoutError,
+        ConnectionError,
+    )
+
+
+class AIClientError(Exception):
+    # Raised instead of calling upstream; carries the HTTP status to return
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def __init__(self, detail: str, retry_after: float = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AIOverloaded(AIClientError):
+    # Concurrency limit and wait queue are full
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+
+
+class AIUnavailable(AIClientError):
+    # Circuit breaker is open
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class AITimeout(AIClientError):
+    # Upstream did not answer within AI_CALL_TIMEOUT_SECONDS (after retries)
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+
+
+def ai_http_error(exc: AIClientError) -> HTTPException:
+    headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after else None
+    return HTTPException(status_code=exc.status_code, detail=exc.detail, headers=headers)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def check(self):
+        # Fail fast if a new call would have to wait and the wait queue is full
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AIOverloaded("AI service is busy, please retry shortly.", retry_after=AI_RETRY_MAX_SECONDS)
+
+    async def __aenter__(self):
+        if self._semaphore.locked():
+            self.check()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AIOverloaded("Timed out waiting for an AI slot, please retry shortly.", retry_after=AI_RETRY_MAX_SECONDS)
+            finally:
+                self.waiting -= 1
+        else:
+            # A free slot is taken without suspending, so the check above cannot race
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    # closed -> (threshold consecutive failures) -> open -> (reset_seconds) -> half-open
+    # half-open lets one trial call through: success closes, failure re-opens.
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        # Raise while the breaker is open (without claiming the half-open trial call)
+        if self.state == "open":
+            self._reject()
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half-open" and self.trial_in_progress):
+            self._reject()
+        if state == "half-open":
+            self.trial_in_progress = True
+
+    def _reject(self):
+        retry_after = self.reset_seconds - (time.monotonic() - self.opened_at)
+        raise AIUnavailable("AI service is temporarily unavailable, please retry later.", retry_after=max(retry_after, 1))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_progress = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+limiter = ConcurrencyLimiter(AI_MAX_CONCURRENCY, AI_MAX_QUEUE, AI_QUEUE_TIMEOUT_SECONDS)
+breaker = CircuitBreaker(AI_BREAKER_FAILURE_THRESHOLD, AI_BREAKER_RESET_SECONDS)
+call_stats = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0}
+
+_models = {}
+_model_factory = None # Overridable for local fakes, see set_model_factory()
+_genai = None
+_genai_lock = threading.Lock() # list_models() runs on the threadpool
+
+
+def get_genai():
+    # google.generativeai, imported and configured with GEMINI_API_KEY on first use
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=get_settings().gemini_api_key)
+            _genai = genai
+        return _genai
+
+
+def set_model_factory(factory):
+    # Replace genai.GenerativeModel (e.g. with a local fake for load tests); None restores it
+    global _model_factory
+    _model_factory = factory
+    _models.clear()
+
+
+def get_model(model_name: str):
+    # One GenerativeModel per model name, shared by all requests
+    model = _models.get(model_name)
+    if model is None:
+        model = (_model_factory or get_genai().GenerativeModel)(model_name)
+        _models[model_name] = model
+    return model
+
+
+def check_available():
+    # Cheap pre-flight used before committing to a streaming response, so an
+    # overloaded or unavailable upstream is reported with a proper HTTP status
+    breaker.check()
+    limiter.check()
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: uniform in [0, base * 2^attempt], capped
+    return random.uniform(0, min(AI_RETRY_MAX_SECONDS, AI_RETRY_BASE_SECONDS * (2 ** attempt)))
+
+
+async def _call_with_retries(start_call):
+    # start_call() -> awaitable for one attempt. Retries transient errors; feeds the breaker.
+    breaker.before_call()
+    attempt = 0
+    while True:
+        call_stats["calls"] += 1
+        try:
+            result = await asyncio.wait_for(start_call(), AI_CALL_TIMEOUT_SECONDS)
+        except transient_errors() as e:
+            if isinstance(e, asyncio.TimeoutError):
+                call_stats["timeouts"] += 1
+            if attempt >= AI_MAX_RETRIES:
+                call_stats["failures"] += 1
+                breaker.record_failure()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise AITimeout(f"AI service did not respond within {AI_CALL_TIMEOUT_SECONDS:g}s.") from e
+                raise AIUnavailable(f"AI service error: {e}") from e
+            call_stats["retries"] += 1
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+        except BaseException:
+            # Non-transient (bad request, safety block, cancellation): not the upstream's health
+            breaker.trial_in_progress = False
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+async def generate_content(model_name: str, contents, **kwargs):
+    # Non-streaming generation through the limiter, breaker, timeout and retries
+    model = get_model(model_name)
+    with timed(ai_latency, model_name, "generate"):
+        async with limiter:
+            return await _call_with_retries(lambda: model.generate_content_async(contents, **kwargs))
+
+
+def _upstream_call(response):
+    # The streaming gRPC call behind an SDK response, or None. The SDK keeps
+    # aiter(call) in the private response._iterator: api_core's _wrapped_aiter()
+    # async generator, whose frame holds the wrapped call while it is not finished.
+    frame = getattr(getattr(response, "_iterator", None), "ag_frame", None)
+    call = frame.f_locals.get("self") if frame is not None else None
+    return call if callable(getattr(call, "cancel", None)) else None
+
+
+async def _close_upstream_stream(iterator, response) -> None:
+    # Cancel the streaming RPC so an abandoned generation stops using quota and a
+    # connection, then close the SDK's generators. Closing alone is not enough: the
+    # gRPC call and its message iterator reference each other, so the call would
+    # only be cancelled whenever the cyclic garbage collector gets to it.
+    call = _upstream_call(response)
+    if call is not None:
+        call.cancel()
+    for generator in (iterator, getattr(response, "_iterator", None)):
+        aclose = getattr(generator, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass # Already failed; the call is cancelled either way
+
+
+async def stream_content(model_name: str, contents, **kwargs):
+    # Async generator of response chunks. Holds a limiter slot for the whole stream;
+    # only opening the stream is retried. Each chunk must arrive within the call timeout.
+    # Closing the generator early (client went away) cancels the upstream call.
+    model = get_model(model_name)
+    with timed(ai_latency, model_name, "stream"): # Whole stream; "error" includes clients going away
+        async with limiter:
+            response = await _call_with_retries(lambda: model.generate_content_async(contents, stream=True, **kwargs))
+            completed = False
+            iterator = response.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), AI_CALL_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        call_stats["timeouts"] += 1
+                        raise AITimeout(f"AI service stalled for more than {AI_CALL_TIMEOUT_SECONDS:g}s.")
+                    yield chunk
+                completed = True
+            finally:
+                if not completed:
+                    await _close_upstream_stream(iterator, response)
+
+
+def ai_client_stats() -> dict:
+    return {"limiter": limiter.stats(), "breaker": breaker.stats(), "calls": dict(call_stats)}
@@ -0,0 +1,3 @@
+# server/benchmarks
+# Standalone benchmark scripts. Run from the repository root, e.g.:
+#   python -m server.benchmarks.search_benchmark --plants 100000
@@ -0,0 +1,113 @@
+# server/benchmarks/bookmarks_benchmark.py
+# Rendering a user's bookmark list: per-plant fetches vs batch lookup vs joined endpoint.
+#
+# Seeds one user with N bookmarked synthetic plants on the configured database
+# (POSTGRES_* environment variables), starts the API in a uvicorn child process
+# with the plant caches disabled, and times three ways a client can load the list:
+#   n_plus_one  GET /bookmarks/user/{id} then GET /plants/{plant_id} per bookmark
+#   batch_ids   GET /bookmarks/user/{id} then one GET /plants/?ids=...
+#   joined      one GET /bookmarks/user/{id}/plants
+# Prints requests per render and latency percentiles as JSON, then deletes the seeded
+# rows. Requires migrations 004 and 005. Needs httpx and uvicorn.
+#
+#   python -m server.benchmarks.bookmarks_benchmark --bookmarks 50 --runs 30
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from sqlalchemy import text
+
+from ..database import get_engine
+from .common import summarize_ms
+from .db_mode_load_test import _free_port, run_server
+
+USER_ID = "bench-bookmarks-user"
+NAME_PREFIX = "Bench Bookmark Plant "
+
+SEED_QUERIES = [
+    text("""
+        INSERT INTO users (google_id, email, first_name) VALUES (:user_id, 'bench-bookmarks@example.com', 'Bench')
+        ON CONFLICT (google_id) DO NOTHING;
+    """),
+    text("""
+        INSERT INTO plants (common_name, scientific_name, description, uses, region, plant_type)
+        SELECT :prefix || g, 'Benchia bookmarkii ' || g, 'Synthetic plant ' || g || ' for the bookmarks benchmark.',
+               ARRAY['Medicinal', 'Culinary'], 'Asia', 'Herb'
+        FROM generate_series(1, :count) AS g;
+    """),
+    text("""
+        INSERT INTO bookmarks (user_google_id, plant_id)
+        SELECT :user_id, plant_id FROM plants WHERE common_name LIKE :prefix || '%';
+    """),
+]
+
+CLEANUP_QUERIES = [
+    text("DELETE FROM bookmarks WHERE user_google_id = :user_id;"),
+    text("DELETE FROM users WHERE google_id = :user_id;"),
+    text("DELETE FROM plants WHERE common_name LIKE :prefix || '%';"),
+]
+
+
+async def _n_plus_one(client, limit):
+    bookmarks = (await client.get(f"/bookmarks/user/{USER_ID}")).json()
+    for bookmark in bookmarks:
+        (await client.get(f"/plants/{bookmark['plant_id']}")).raise_for_status()
+    return 1 + len(bookmarks)
+
+
+async def _batch_ids(client, limit):
+    bookmarks = (await client.get(f"/bookmarks/user/{USER_ID}")).json()
+    ids = ",".join(str(bookmark["plant_id"]) for bookmark in bookmarks)
+    (await client.get("/plants/", params={"ids": ids})).raise_for_status()
+    return 2
+
+
+async def _joined(client, limit):
+    (await client.get(f"/bookmarks/user/{USER_ID}/plants", params={"limit": limit})).raise_for_status()
+    return 1
+
+
+STRATEGIES = {"n_plus_one": _n_plus_one, "batch_ids": _batch_ids, "joined": _joined}
+
+
+async def _measure(base_url: str, limit: int, runs: int) -> dict:
+    report = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for name, strategy in STRATEGIES.items():
+            await strategy(client, limit) # warm up
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                requests_made = await strategy(client, limit)
+                samples.append((time.perf_counter() - start) * 1000)
+            report[name] = {"requests_per_render": requests_made, "latency": summarize_ms(samples)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookmarks", type=int, default=50, help="bookmarked plants to seed for the user")
+    parser.add_argument("--runs", type=int, default=30, help="timed renders per strategy")
+    args = parser.parse_args()
+
+    params = {"user_id": USER_ID, "prefix": NAME_PREFIX, "count": args.bookmarks}
+    with get_engine().begin() as conn:
+        for query in SEED_QUERIES:
+            conn.execute(query, params)
+    try:
+        env = {"PLANT_CACHE_SIZE": "0", "PLANT_LIST_CACHE_SIZE": "0"}
+        with run_server(env, _free_port()) as base_url:
+            report = {"bookmarks": args.bookmarks, "runs": args.runs}
+            report.update(asyncio.run(_measure(base_url, args.bookmarks, args.runs)))
+    finally:
+        with get_engine().begin() as conn:
+            for query in CLEANUP_QUERIES:
+                conn.execute(query, params)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# server/benchmarks/db_mode_load_test.py
+# Load test comparing DB_ASYNC=true (asyncpg) and DB_ASYNC=false (psycopg2 on the threadpool).
+#
+# Starts one uvicorn process per mode against the configured database
+# (POSTGRES_* environment variables), drives DB-bound endpoints with many
+# concurrent connections and prints requests/sec and latency percentiles as JSON.
+# The plant caches are disabled so every request reaches Postgres. Needs httpx.
+#
+#   python -m server.benchmarks.db_mode_load_test --concurrency 200 --duration 20
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .common import summarize_ms
+
+PATHS = ["/plants/?limit=20", "/plants/1", "/users/?limit=20", "/bookmarks/?limit=20"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def run_server(extra_env: dict, port: int, app_path: str = "server.main:app", workers: int = 1):
+    # Runs the app in a child uvicorn process until the block exits
+    env = dict(os.environ, **extra_env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        else:
+            raise RuntimeError("server did not start within 30s")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def _drive(base_url: str, concurrency: int, duration: float, paths=PATHS) -> dict:
+    samples, errors = [], 0
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker(offset):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < stop_at:
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(paths[i % len(paths)])
+                    if resp.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                samples.append((time.perf_counter() - start) * 1000)
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests_per_sec": round(len(samples) / elapsed, 1), "errors": errors, "latency": summarize_ms(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per mode")
+    args = parser.parse_args()
+
+    report = {"concurrency": args.concurrency, "duration_seconds": args.duration, "modes": {}}
+    for mode in ("true", "false"):
+        env = {"DB_ASYNC": mode, "PLANT_CACHE_SIZE": "0", "PLANT_LIST_CACHE_SIZE": "0"}
+        with run_server(env, _free_port()) as base_url:
+            asyncio.run(_drive(base_url, min(args.concurrency, 10), 2)) # warm up the pool
+            report["modes"]["async" if mode == "true" else "sync"] = asyncio.run(
+                _drive(base_url, args.concurrency, args.duration)
+            )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
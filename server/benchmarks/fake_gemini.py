@@ -0,0 +1,57 @@
+# server/benchmarks/fake_gemini.py
+# Local stand-in for the Gemini SDK, for load tests and benchmarks.
+#
+# FakeModel has the parts of genai.GenerativeModel the API uses
+# (generate_content_async, streaming or not) and answers after a configurable
+# delay without any network access. Serve the API with it installed:
+#
+#   FAKE_AI_LATENCY_MS=800 uvicorn server.benchmarks.fake_gemini:app
+import asyncio
+import os
+import random
+
+from .. import ai_client
+from ..main import app # noqa: F401  (re-exported for uvicorn)
+
+FAKE_AI_LATENCY_MS = float(os.getenv("FAKE_AI_LATENCY_MS", "500")) # Mean time to the full answer
+FAKE_AI_JITTER = float(os.getenv("FAKE_AI_JITTER", "0.3")) # +/- fraction of the latency
+FAKE_AI_STREAM_CHUNKS = int(os.getenv("FAKE_AI_STREAM_CHUNKS", "5"))
+
+FAKE_ANSWER = (
+    "Plant Name: Tulsi\n"
+    "Description: Holy basil, an aromatic shrub in the mint family.\n"
+    "Usage: Used in Ayurveda for coughs, colds and as a general tonic.\n"
+)
+
+
+class FakeResponse:
+    def __init__(self, text: str, chunks=None):
+        self.text = text
+        self._chunks = chunks or []
+
+    async def __aiter__(self):
+        for delay, chunk in self._chunks:
+            await asyncio.sleep(delay)
+            yield FakeResponse(chunk)
+
+
+class FakeModel:
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+
+    def _latency(self) -> float:
+        return FAKE_AI_LATENCY_MS / 1000 * random.uniform(1 - FAKE_AI_JITTER, 1 + FAKE_AI_JITTER)
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        latency = self._latency()
+        if not stream:
+            await asyncio.sleep(latency)
+            return FakeResponse(FAKE_ANSWER)
+        # Time to first chunk is a third of the latency, the rest is spread over the chunks
+        step = max(1, len(FAKE_ANSWER) // FAKE_AI_STREAM_CHUNKS)
+        pieces = [FAKE_ANSWER[i:i + step] for i in range(0, len(FAKE_ANSWER), step)]
+        await asyncio.sleep(latency / 3)
+        return FakeResponse(FAKE_ANSWER, [(latency * 2 / 3 / len(pieces), piece) for piece in pieces])
+
+
+ai_client.set_model_factory(FakeModel)
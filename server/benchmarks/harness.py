@@ -0,0 +1,308 @@
+# server/benchmarks/harness.py
+# Reproducible mixed-workload benchmark of the whole API.
+#
+# 1. (--setup-schema) applies server/migrations/*.sql in order to the configured
+#    database (POSTGRES_* environment variables); use a local/throwaway Postgres.
+# 2. Seeds synthetic users, plants and bookmarks (all prefixed "bench-" /
+#    "Bench Load Plant "), which are deleted again at the end unless --keep-data.
+# 3. Starts the API in uvicorn with server.benchmarks.fake_gemini installed, so
+#    chat answers come from a local fake with FAKE_AI_LATENCY_MS latency.
+# 4. Drives a weighted mix of user actions from --concurrency clients for --duration
+#    seconds and prints throughput, errors and p50/p95/p99 per endpoint as JSON,
+#    tagged with the current git commit so runs can be compared between commits.
+# Needs httpx and uvicorn.
+#
+#   python -m server.benchmarks.harness --setup-schema --plants 5000 --users 500 \
+#       --concurrency 50 --duration 30 --output bench.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import text
+
+from ..database import get_engine
+from .common import summarize_ms
+from .db_mode_load_test import _free_port, run_server
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+USER_PREFIX = "bench-user-"
+PLANT_PREFIX = "Bench Load Plant "
+
+SEARCH_TERMS = ["tulsi", "mint", "ashwaghandha", "ginger root", "digestive", "fever", "aloe vera", "neem", "zzz-no-match"]
+CHAT_MESSAGES = [
+    "What is tulsi good for?",
+    "How do I grow mint indoors?",
+    "Which herbs help with digestion?",
+    "Is neem safe for skin?",
+    "What are the benefits of ashwagandha?",
+]
+
+SEED_QUERIES = [
+    text("""
+        INSERT INTO plants (common_name, scientific_name, description, uses, region, plant_type, image_url)
+        SELECT
+            :plant_prefix || g || ' ' || (ARRAY['Basil', 'Mint', 'Neem', 'Tulsi', 'Ginger', 'Aloe', 'Brahmi', 'Ashwagandha', 'Turmeric', 'Fennel'])[1 + g % 10],
+            'Benchia loadtestii ' || g,
+            'Synthetic plant ' || g || ', traditionally used for ' ||
+                (ARRAY['fever', 'digestion', 'skin care', 'stress', 'coughs'])[1 + g % 5] || '.',
+            ARRAY[(ARRAY['Medicinal', 'Culinary', 'Aromatic', 'Ornamental', 'Digestive'])[1 + g % 5],
+                  (ARRAY['Antiseptic', 'Tonic', 'Calming'])[1 + g % 3]],
+            (ARRAY['Asia', 'Europe', 'Africa', 'Americas'])[1 + g % 4],
+            (ARRAY['Herb', 'Shrub', 'Tree', 'Climber'])[1 + g % 4],
+            'https://example.com/plants/' || g || '.jpg'
+        FROM generate_series(1, :plants) AS g;
+    """),
+    text("""
+        INSERT INTO users (google_id, email, first_name, last_name)
+        SELECT :user_prefix || g, 'bench' || g || '@example.com', 'Bench', 'User ' || g
+        FROM generate_series(1, :users) AS g
+        ON CONFLICT (google_id) DO NOTHING;
+    """),
+    # Same --seed, same bookmarks: random() is seeded, and plants are picked by
+    # position in plant_id order (the n-th seeded plant has the same name every run)
+    text("SELECT setseed(:sql_seed);"),
+    text("""
+        WITH bench_plants AS (
+            SELECT ARRAY_AGG(plant_id ORDER BY plant_id) AS ids FROM plants WHERE common_name LIKE :plant_prefix || '%'
+        )
+        INSERT INTO bookmarks (user_google_id, plant_id)
+        SELECT :user_prefix || u, ids[1 + FLOOR(random() * ARRAY_LENGTH(ids, 1))::INTEGER]
+        FROM bench_plants, generate_series(1, :users) AS u, generate_series(1, :bookmarks_per_user)
+        ON CONFLICT (user_google_id, plant_id) DO NOTHING;
+    """),
+    text("ANALYZE users, plants, bookmarks;"),
+]
+
+CLEANUP_QUERIES = [
+    text("DELETE FROM bookmarks WHERE user_google_id LIKE :user_prefix || '%';"),
+    text("DELETE FROM users WHERE google_id LIKE :user_prefix || '%';"),
+    text("DELETE FROM plants WHERE common_name LIKE :plant_prefix || '%';"),
+]
+
+
+def apply_migrations():
+    # Each file is sent as one script (they contain functions with $$ bodies)
+    connection = get_engine().raw_connection()
+    try:
+        cursor = connection.cursor()
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            cursor.execute(path.read_text())
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def seed(params: dict) -> dict:
+    start = time.perf_counter()
+    with get_engine().begin() as conn:
+        for query in SEED_QUERIES:
+            conn.execute(query, params)
+        plant_ids = [row.plant_id for row in conn.execute(
+            text("SELECT plant_id FROM plants WHERE common_name LIKE :plant_prefix || '%' ORDER BY plant_id;"), params
+        )]
+        bookmark_count = conn.execute(
+            text("SELECT COUNT(*) FROM bookmarks WHERE user_google_id LIKE :user_prefix || '%';"), params
+        ).scalar()
+    return {"plant_ids": plant_ids, "bookmarks": bookmark_count, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def cleanup(params: dict):
+    with get_engine().begin() as conn:
+        for query in CLEANUP_QUERIES:
+            conn.execute(query, params)
+
+
+class Workload:
+    # One simulated client. Each action makes one or more requests through
+    # `request`, which records latency and status under an endpoint name.
+    def __init__(self, client: httpx.AsyncClient, plant_ids: list, users: int, rng: random.Random):
+        self.client = client
+        self.plant_ids = plant_ids
+        self.users = users
+        self.rng = rng
+        self.samples = {} # endpoint -> [ms]
+        self.statuses = {} # endpoint -> {status: count}
+        self.errors = 0
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        status_code = "error"
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            await response.aread()
+            status_code = response.status_code
+            if status_code >= 500:
+                self.errors += 1
+            return response
+        except httpx.HTTPError:
+            self.errors += 1
+        finally:
+            self.samples.setdefault(endpoint, []).append((time.perf_counter() - start) * 1000)
+            counts = self.statuses.setdefault(endpoint, {})
+            counts[str(status_code)] = counts.get(str(status_code), 0) + 1
+
+    def _user(self) -> str:
+        return f"{USER_PREFIX}{self.rng.randint(1, self.users)}"
+
+    async def browse(self):
+        # First page, then follow the keyset cursor for a couple of pages
+        response = await self.request("GET /plants/ (browse)", "GET", "/plants/", params={"limit": 20})
+        for _ in range(self.rng.randint(0, 2)):
+            cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+            if not cursor:
+                break
+            response = await self.request("GET /plants/ (browse)", "GET", "/plants/", params={"limit": 20, "after": cursor})
+
+    async def plant_detail(self):
+        await self.request("GET /plants/{plant_id}", "GET", f"/plants/{self.rng.choice(self.plant_ids)}")
+
+    async def search(self):
+        await self.request("GET /plants/?q= (search)", "GET", "/plants/", params={"q": self.rng.choice(SEARCH_TERMS), "limit": 20})
+
+    async def bookmark_toggle(self):
+        user = self._user()
+        plant_id = self.rng.choice(self.plant_ids)
+        response = await self.request("POST /bookmarks/", "POST", "/bookmarks/", json={"user_google_id": user, "plant_id": plant_id})
+        if response is not None and response.status_code == 409:
+            await self.request("DELETE /bookmarks/{user}/{plant_id}", "DELETE", f"/bookmarks/{user}/{plant_id}")
+
+    async def my_bookmarks(self):
+        await self.request("GET /bookmarks/user/{id}/plants", "GET", f"/bookmarks/user/{self._user()}/plants", params={"limit": 50})
+
+    async def login_sync(self):
+        n = self.rng.randint(1, self.users)
+        await self.request("POST /users/sync", "POST", "/users/sync", json={
+            "google_id": f"{USER_PREFIX}{n}", "email": f"bench{n}@example.com", "first_name": "Bench", "last_name": f"User {n}"
+        })
+
+    async def chat(self):
+        await self.request("POST /ai/chat", "POST", "/ai/chat", json={"message": self.rng.choice(CHAT_MESSAGES)})
+
+
+# action -> relative weight
+WORKLOAD_MIX = {
+    "browse": 30,
+    "plant_detail": 25,
+    "search": 20,
+    "my_bookmarks": 8,
+    "bookmark_toggle": 8,
+    "login_sync": 5,
+    "chat": 4,
+}
+
+
+async def drive(base_url: str, plant_ids: list, users: int, concurrency: int, duration: float, seed_value: int) -> dict:
+    actions, weights = zip(*WORKLOAD_MIX.items())
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        workloads = [Workload(client, plant_ids, users, random.Random(seed_value + n)) for n in range(concurrency)]
+        stop_at = time.monotonic() + duration
+
+        async def run(workload):
+            while time.monotonic() < stop_at:
+                action = workload.rng.choices(actions, weights)[0]
+                await getattr(workload, action)()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(workload) for workload in workloads))
+        elapsed = time.perf_counter() - started
+
+    samples, statuses = {}, {}
+    for workload in workloads:
+        for endpoint, values in workload.samples.items():
+            samples.setdefault(endpoint, []).extend(values)
+        for endpoint, counts in workload.statuses.items():
+            merged = statuses.setdefault(endpoint, {})
+            for status_code, count in counts.items():
+                merged[status_code] = merged.get(status_code, 0) + count
+    total = sum(len(values) for values in samples.values())
+    return {
+        "requests": total,
+        "requests_per_sec": round(total / elapsed, 1),
+        "errors": sum(workload.errors for workload in workloads),
+        "endpoints": {
+            endpoint: {
+                "requests_per_sec": round(len(values) / elapsed, 1),
+                "statuses": statuses[endpoint],
+                **summarize_ms(values),
+            }
+            for endpoint, values in sorted(samples.items())
+        },
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--setup-schema", action="store_true", help="apply server/migrations/*.sql first")
+    parser.add_argument("--plants", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--bookmarks-per-user", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load after a short warm-up")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--ai-latency-ms", type=float, default=800.0, help="fake Gemini latency")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the seeded bookmarks and the workload")
+    parser.add_argument("--keep-data", action="store_true", help="leave the seeded rows in place")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.setup_schema:
+        apply_migrations()
+
+    params = {
+        "plant_prefix": PLANT_PREFIX,
+        "user_prefix": USER_PREFIX,
+        "plants": args.plants,
+        "users": args.users,
+        "bookmarks_per_user": args.bookmarks_per_user,
+        "sql_seed": (args.seed % 2001 - 1000) / 1000, # setseed() takes a value in [-1, 1]
+    }
+    cleanup(params) # Leftovers from an interrupted run
+    seeded = seed(params)
+    try:
+        env = {"FAKE_AI_LATENCY_MS": str(args.ai_latency_ms)}
+        with run_server(env, _free_port(), app_path="server.benchmarks.fake_gemini:app", workers=args.workers) as base_url:
+            asyncio.run(drive(base_url, seeded["plant_ids"], args.users, min(args.concurrency, 10), 2, args.seed)) # warm up
+            results = asyncio.run(drive(base_url, seeded["plant_ids"], args.users, args.concurrency, args.duration, args.seed))
+    finally:
+        if not args.keep_data:
+            cleanup(params)
+
+    report = {
+        "commit": _git_commit(),
+        "config": {
+            "plants": args.plants,
+            "users": args.users,
+            "bookmarks": seeded["bookmarks"],
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "workers": args.workers,
+            "ai_latency_ms": args.ai_latency_ms,
+            "seed": args.seed,
+            "mix": WORKLOAD_MIX,
+            "db_async": os.getenv("DB_ASYNC", "true"),
+        },
+        "seed_seconds": seeded["seconds"],
+        **results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# server/benchmarks/recommendations_benchmark.py
+# Build, update and query cost of the co-occurrence index (server/recommendations.py).
+#
+# Generates N synthetic bookmarks in-process (no database): users with a varying
+# number of bookmarks, plant popularity skewed towards a head of favourites. Times
+# the full build, incremental bookmark adds/removes, compaction of the resulting
+# deltas, and related()/popular() lookups before and after compaction. Memory is the
+# tracemalloc delta of a second build (slower, so measured separately from the timing).
+#
+#   python -m server.benchmarks.recommendations_benchmark --bookmarks 1000000
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from ..recommendations import CoOccurrenceIndex
+from .common import summarize_ms
+
+
+def synthetic_bookmarks(count: int, users: int, plants: int, seed: int = 42):
+    # (user_google_id, plant_id) pairs, grouped by user like the load query returns them
+    rng = random.Random(seed)
+    pairs = set()
+    while len(pairs) < count:
+        user = rng.randrange(users)
+        plant = 1 + int(plants * rng.random() ** 2) # Skewed: low ids are the popular ones
+        pairs.add((f"bench-user-{user}", plant))
+    return sorted(pairs)
+
+
+def _time_calls(function, arguments) -> dict:
+    samples = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize_ms(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookmarks", type=int, default=1_000_000, help="synthetic bookmarks")
+    parser.add_argument("--users", type=int, default=100_000, help="distinct users")
+    parser.add_argument("--plants", type=int, default=20_000, help="distinct plants")
+    parser.add_argument("--updates", type=int, default=20_000, help="incremental adds + removes to time")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the (slow) tracemalloc build")
+    args = parser.parse_args()
+
+    rows = synthetic_bookmarks(args.bookmarks, args.users, args.plants)
+    report = {"bookmarks": len(rows), "users": args.users, "plants": args.plants}
+
+    start = time.perf_counter()
+    index = CoOccurrenceIndex.build(rows)
+    report["build_seconds"] = round(time.perf_counter() - start, 2)
+    report["index"] = index.stats()
+
+    if not args.skip_memory:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        measured = CoOccurrenceIndex.build(rows)
+        report["index_mb"] = round((tracemalloc.get_traced_memory()[0] - before) / 1024 / 1024, 1)
+        tracemalloc.stop()
+        del measured
+
+    rng = random.Random(7)
+    lookups = [(1 + int(args.plants * rng.random() ** 2), 10) for _ in range(2000)]
+    report["related_ms"] = _time_calls(index.related, lookups)
+
+    # Half adds of new bookmarks, half removals of existing ones
+    adds = [(f"bench-user-{rng.randrange(args.users)}", 1 + rng.randrange(args.plants)) for _ in range(args.updates // 2)]
+    removes = [rng.choice(rows) for _ in range(args.updates // 2)]
+    report["add_ms"] = _time_calls(index.add, adds)
+    report["remove_ms"] = _time_calls(index.remove, removes)
+    report["related_ms_with_deltas"] = _time_calls(index.related, lookups)
+
+    dirty = index.dirty_plants()
+    report["pending_delta_entries"] = index.stats()["pending_delta_entries"]
+    start = time.perf_counter()
+    for plant_id in dirty:
+        index.compact_plant(plant_id)
+    report["compaction"] = {"plants": len(dirty), "seconds": round(time.perf_counter() - start, 3)}
+    report["related_ms_after_compaction"] = _time_calls(index.related, lookups)
+
+    start = time.perf_counter()
+    index.popular(10)
+    report["popular_recompute_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# server/benchmarks/search_benchmark.py
+# Search latency against a large synthetic catalog.
+#
+# Seeds N synthetic plants inside a single transaction on the configured database
+# (POSTGRES_* environment variables), times the indexed search query from
+# server/search.py against the old four-column ILIKE scan, then ROLLS BACK so
+# nothing is left behind. Requires migrations/001_plant_search.sql to be applied.
+#
+#   python -m server.benchmarks.search_benchmark --plants 100000 --runs 50
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+
+from ..database import get_engine
+from .. import search
+from .common import summarize_ms
+
+SEED_QUERY = text("""
+    INSERT INTO plants (common_name, scientific_name, description, uses, region, plant_type)
+    SELECT
+        'Bench Herb ' || g || ' ' || (ARRAY['Basil', 'Mint', 'Neem', 'Tulsi', 'Ginger', 'Aloe', 'Brahmi', 'Ashwagandha'])[1 + g % 8],
+        'Benchia ' || (ARRAY['sanctum', 'piperita', 'indica', 'officinale', 'vera', 'monnieri', 'somnifera'])[1 + g % 7] || ' ' || g,
+        'Synthetic plant number ' || g || ' used for search benchmarking. Grows in ' ||
+            (ARRAY['tropical', 'temperate', 'arid', 'alpine'])[1 + g % 4] || ' climates.',
+        ARRAY[(ARRAY['Medicinal', 'Culinary', 'Aromatic', 'Ornamental', 'Digestive', 'Antiseptic'])[1 + g % 6]],
+        (ARRAY['Asia', 'Europe', 'Africa', 'Americas'])[1 + g % 4],
+        (ARRAY['Herb', 'Shrub', 'Tree', 'Climber'])[1 + g % 4]
+    FROM generate_series(1, :count) AS g;
+""")
+
+LEGACY_QUERY = text("""
+    SELECT plant_id FROM plants
+    WHERE common_name ILIKE :search OR
+          scientific_name ILIKE :search OR
+          description ILIKE :search OR
+          ARRAY_TO_STRING(uses, ' ') ILIKE :search
+    OFFSET 0 LIMIT 100;
+""")
+
+INDEXED_QUERY = text(
+    "SELECT plant_id FROM plants WHERE 1=1"
+    + search.SEARCH_FILTER
+    + f" ORDER BY {search.SEARCH_RANK} DESC, plant_id OFFSET 0 LIMIT 100;"
+)
+
+# Exact names, typos, partial names, uses and description words
+TERMS = ["tulsi", "tulsy", "ashwaghandha", "gin", "digestive", "alpine climates", "benchia vera", "zzzz-no-match"]
+
+
+def _time_query(conn, query, params, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize_ms(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plants", type=int, default=100_000, help="synthetic plants to seed")
+    parser.add_argument("--runs", type=int, default=30, help="timed runs per term")
+    args = parser.parse_args()
+
+    report = {"plants_seeded": args.plants, "terms": {}}
+    with get_engine().connect() as conn:
+        trans = conn.begin()
+        try:
+            start = time.perf_counter()
+            conn.execute(SEED_QUERY, {"count": args.plants})
+            conn.execute(text("ANALYZE plants;"))
+            report["seed_seconds"] = round(time.perf_counter() - start, 2)
+
+            for term in TERMS:
+                report["terms"][term] = {
+                    "legacy_ilike": _time_query(conn, LEGACY_QUERY, {"search": f"%{term}%"}, args.runs),
+                    "indexed": _time_query(conn, INDEXED_QUERY, search.search_params(term), args.runs),
+                }
+        finally:
+            trans.rollback()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
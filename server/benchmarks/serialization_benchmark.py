@@ -0,0 +1,127 @@
+# server/benchmarks/serialization_benchmark.py
+# Cost of turning plant rows into JSON: Pydantic models + response_model vs the fast path.
+#
+# Part 1 (no database) times one 100-row page both ways, in-process:
+#   pydantic   schemas.Plant(**row) per row, then FastAPI's response_model step
+#              (validate list[Plant], dump to JSON-able data, json.dumps)
+#   fast_path  plant_row_dict(row) per row, then serialization.dumps (orjson if installed)
+# Part 2 seeds 100 plants with image URLs on the configured database (POSTGRES_*),
+# starts the API with JSON_FAST_PATH=false and =true, and drives GET /plants/?limit=100
+# (served from the page cache, so serialization dominates). The seeded rows are deleted
+# afterwards. Needs httpx and uvicorn for part 2; --skip-http runs part 1 only.
+#
+#   python -m server.benchmarks.serialization_benchmark --concurrency 50 --duration 10
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import text
+
+from .. import schemas, serialization
+from .common import summarize_ms
+
+PAGE_SIZE = 100
+NAME_PREFIX = "Bench Serialization Plant "
+
+SEED_QUERY = text("""
+    INSERT INTO plants (common_name, scientific_name, description, uses, region, plant_type, image_url, three_d_model_url)
+    SELECT :prefix || g, 'Benchia serialis ' || g, 'Synthetic plant ' || g || ' for the serialization benchmark.',
+           ARRAY['Medicinal', 'Culinary', 'Aromatic'], 'Asia', 'Herb',
+           'https://example.com/images/plant-' || g || '.jpg', 'https://example.com/models/plant-' || g || '.glb'
+    FROM generate_series(1, :count) AS g;
+""")
+CLEANUP_QUERY = text("DELETE FROM plants WHERE common_name LIKE :prefix || '%';")
+
+
+def _rows(count: int) -> List[dict]:
+    return [
+        {
+            "plant_id": i,
+            "common_name": f"{NAME_PREFIX}{i}",
+            "scientific_name": f"Benchia serialis {i}",
+            "description": f"Synthetic plant {i} for the serialization benchmark.",
+            "uses": ["Medicinal", "Culinary", "Aromatic"],
+            "region": "Asia",
+            "plant_type": "Herb",
+            "image_url": f"https://example.com/images/plant-{i}.jpg",
+            "three_d_model_url": f"https://example.com/models/plant-{i}.glb",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _time_page(render, rows, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        render(rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    summary = summarize_ms(samples)
+    summary["per_row_us"] = round(summary["p50_ms"] * 1000 / len(rows), 2)
+    return summary
+
+
+def per_row_report(runs: int) -> dict:
+    page_adapter = TypeAdapter(List[schemas.Plant])
+
+    def pydantic_page(rows):
+        # What the endpoint did before: build models, then FastAPI validates and serializes them again
+        plants = [schemas.Plant(**row) for row in rows]
+        validated = page_adapter.validate_python(plants, from_attributes=True)
+        content = page_adapter.dump_python(validated, mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def fast_page(rows):
+        return serialization.dumps([serialization.plant_row_dict(row) for row in rows])
+
+    rows = _rows(PAGE_SIZE)
+    assert json.loads(pydantic_page(rows)) == json.loads(fast_page(rows)) # Same output contract
+    return {
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "page_size": PAGE_SIZE,
+        "pydantic": _time_page(pydantic_page, rows, runs),
+        "fast_path": _time_page(fast_page, rows, runs),
+    }
+
+
+def http_report(concurrency: int, duration: float) -> dict:
+    from ..database import get_engine
+    from .db_mode_load_test import _drive, _free_port, run_server
+
+    params = {"prefix": NAME_PREFIX, "count": PAGE_SIZE}
+    with get_engine().begin() as conn:
+        conn.execute(SEED_QUERY, params)
+    try:
+        report = {}
+        paths = [f"/plants/?limit={PAGE_SIZE}"]
+        for fast_path in ("false", "true"):
+            with run_server({"JSON_FAST_PATH": fast_path}, _free_port()) as base_url:
+                asyncio.run(_drive(base_url, min(concurrency, 10), 2, paths)) # warm up
+                report["fast_path" if fast_path == "true" else "pydantic"] = asyncio.run(
+                    _drive(base_url, concurrency, duration, paths)
+                )
+        return report
+    finally:
+        with get_engine().begin() as conn:
+            conn.execute(CLEANUP_QUERY, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=500, help="in-process page renders per mode")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of HTTP load per mode")
+    parser.add_argument("--skip-http", action="store_true", help="only run the in-process part")
+    args = parser.parse_args()
+
+    report = {"per_page": per_row_report(args.runs)}
+    if not args.skip_http:
+        report["http_plants_page"] = http_report(args.concurrency, args.duration)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# server/benchmarks/startup_benchmark.py
+# Cold-start cost: import time of server.main and time to the first served request.
+#
+# Each run uses a fresh interpreter, like a new pod:
+#   import       "import server.main", timed in-process; also lists which heavy
+#                libraries were loaded by the import (they should load on first use)
+#   top_imports  the slowest modules by cumulative time, from python -X importtime
+#   first_request  uvicorn spawn -> first 200 from /livez, and -> first 200 from /readyz
+#                (needs the POSTGRES_* environment variables and a reachable database)
+# Prints JSON. Needs httpx and uvicorn.
+#
+#   python -m server.benchmarks.startup_benchmark --runs 5
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .common import summarize_ms
+from .db_mode_load_test import _free_port
+
+HEAVY_MODULES = ("google.generativeai", "google.api_core", "PIL", "asyncpg", "psycopg2")
+
+IMPORT_SNIPPET = f"""
+import json, sys, time
+start = time.perf_counter()
+import server.main
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _import_once() -> dict:
+    result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _top_imports(count: int) -> list:
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server.main"], capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if "." not in name: # Top-level packages only; submodules are included in their cumulative time
+            rows.append((int(parts[1]), name))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:count]]
+
+
+def _wait_for(client, url: str, deadline: float):
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url, timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def _first_request_once() -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+    try:
+        deadline = time.monotonic() + 60
+        with httpx.Client() as client:
+            live = _wait_for(client, f"{base_url}/livez", deadline)
+            live_ms = (time.perf_counter() - start) * 1000
+            ready = live and _wait_for(client, f"{base_url}/readyz", deadline)
+            ready_ms = (time.perf_counter() - start) * 1000
+        return {"livez_ms": live_ms if live else None, "readyz_ms": ready_ms if ready else None}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters / server starts per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    imports = [_import_once() for _ in range(args.runs)]
+    starts = [_first_request_once() for _ in range(args.runs)]
+    report = {
+        "import": summarize_ms([run["ms"] for run in imports]),
+        "heavy_modules_loaded_at_import": imports[-1]["loaded"],
+        "top_imports": _top_imports(args.top),
+        "first_livez": summarize_ms([run["livez_ms"] for run in starts if run["livez_ms"] is not None]),
+        "first_readyz": summarize_ms([run["readyz_ms"] for run in starts if run["readyz_ms"] is not None]),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# server/benchmarks/typeahead_benchmark.py
+# Per-keystroke latency and memory of the typeahead prefix index (server/typeahead.py).
+#
+# Builds the index in-process from N synthetic plants (no database), then replays
+# what a user typing each query produces: one suggest() call per prefix length.
+# Memory is the tracemalloc delta for building the index, i.e. what it keeps resident
+# (the name strings themselves are shared with the loaded rows and not counted).
+#
+#   python -m server.benchmarks.typeahead_benchmark --plants 100000
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from ..typeahead import PrefixIndex
+from .common import summarize_ms
+
+GENERA = ["Ocimum", "Mentha", "Azadirachta", "Zingiber", "Aloe", "Bacopa", "Withania", "Curcuma", "Centella", "Tinospora"]
+EPITHETS = ["sanctum", "piperita", "indica", "officinale", "vera", "monnieri", "somnifera", "longa", "asiatica", "cordifolia"]
+COMMON = ["Basil", "Mint", "Neem", "Ginger", "Aloe", "Brahmi", "Ashwagandha", "Turmeric", "Gotu Kola", "Giloy", "Tulsí", "Málva"]
+USES = ["Medicinal", "Culinary", "Aromatic", "Ornamental", "Digestive", "Antiseptic", "Fever remedy", "Skin care"]
+
+SYLLABLES = ["ka", "ve", "ri", "lo", "ma", "nu", "si", "ta", "pe", "ro", "du", "li", "shi", "ya", "go", "ne"]
+
+QUERIES = ["tulsi", "ashwagandha", "ocimum sanctum", "kaveri", "medicinal", "malva", "gotu kola", "zzzz"]
+
+
+def _word(rng) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_rows(count: int):
+    # Realistic shape: a few words per name, a shared vocabulary of genera, common
+    # names and uses, and one made-up word per plant to keep names distinct
+    rng = random.Random(42)
+    for plant_id in range(1, count + 1):
+        word = _word(rng)
+        yield (
+            plant_id,
+            f"{word.capitalize()} {rng.choice(COMMON)}",
+            f"{rng.choice(GENERA)} {rng.choice(EPITHETS)} {word}",
+            rng.sample(USES, 2),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plants", type=int, default=100_000, help="synthetic plants to index")
+    parser.add_argument("--rounds", type=int, default=200, help="times each query is typed")
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.plants))
+    start = time.perf_counter()
+    index = PrefixIndex.build(rows)
+    build_seconds = time.perf_counter() - start
+
+    # Second build under tracemalloc (much slower) to measure what the index keeps
+    del index
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    index = PrefixIndex.build(rows)
+    index_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    samples = []
+    for _ in range(args.rounds):
+        for query in QUERIES:
+            for length in range(1, len(query) + 1):
+                start = time.perf_counter()
+                index.suggest(query[:length], 10)
+                samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    index.add(args.plants + 1, "Benchmark Added Herb", "Addita benchmarkia", ["Medicinal"])
+    add_ms = (time.perf_counter() - start) * 1000
+
+    report = {
+        "plants": args.plants,
+        **index.stats(),
+        "build_seconds": round(build_seconds, 2),
+        "index_mb": round(index_bytes / 1024 / 1024, 1),
+        "add_plant_ms": round(add_ms, 3),
+        "keystroke": summarize_ms(samples),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# server/bulk_import.py
+# Streaming bulk import of plants from NDJSON or CSV.
+#
+# Input is consumed in bounded chunks of rows: each chunk is validated, checked for
+# common/scientific name conflicts with ONE set-based query, inserted with ONE
+# multi-row INSERT ... ON CONFLICT DO NOTHING and committed. Memory use depends on
+# the chunk size and BULK_IMPORT_MAX_ROW_BYTES, not on the size of the upload: a
+# longer row (or an unbalanced CSV quote swallowing the lines after it) is reported
+# as invalid and parsing resumes at the next line. Every input row gets one report
+# entry (inserted / conflict / invalid) handed to the caller's `write` callback.
+#
+# Used by POST /plants/bulk and by the CLI:
+#   python -m server.bulk_import plants.ndjson
+#   python -m server.bulk_import plants.csv --format csv > report.ndjson
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from . import schemas, facets
+from .database import async_session
+
+CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+MAX_CHUNK_SIZE = 4000 # 8 bind parameters per row must stay under Postgres' 32767 limit
+MAX_ROW_BYTES = int(os.getenv("BULK_IMPORT_MAX_ROW_BYTES", str(1024 * 1024))) # One NDJSON line or CSV record
+FORMATS = ("ndjson", "csv")
+
+PLANT_COLUMNS = ("common_name", "scientific_name", "description", "uses", "region", "plant_type", "image_url", "three_d_model_url")
+CSV_USES_SEPARATOR = ";" # CSV has no arrays: "Medicinal;Culinary" -> ["Medicinal", "Culinary"]
+
+
+TOO_LONG = None # Yielded by _iter_lines() in place of a line over max_line_bytes
+
+
+def _too_long_error(max_row_bytes: int) -> str:
+    return f"Row exceeds the {max_row_bytes} byte limit."
+
+
+async def _iter_lines(byte_chunks, max_line_bytes: int = MAX_ROW_BYTES):
+    # Split an async stream of byte chunks into (decoded line, size in bytes) without
+    # buffering the whole body. Lines are split on raw bytes (b"\n" never occurs inside
+    # a UTF-8 sequence), so every byte is scanned once. A line longer than
+    # max_line_bytes is dropped up to its newline and yielded as (TOO_LONG, size).
+    pieces = [] # Bytes of the current line so far
+    size = 0
+    encoding = "utf-8-sig" # Strips a byte order mark from the first line only
+
+    def finish_line():
+        nonlocal pieces, size, encoding
+        line = TOO_LONG if size > max_line_bytes else b"".join(pieces).decode(encoding).rstrip("\r")
+        result = (line, size)
+        pieces, size, encoding = [], 0, "utf-8"
+        return result
+
+    async for chunk in byte_chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end < 0 else chunk[start:end]
+            size += len(piece)
+            if size <= max_line_bytes:
+                pieces.append(piece)
+            elif pieces:
+                pieces = [] # Over the limit: keep counting, stop buffering
+            if end < 0:
+                break
+            yield finish_line()
+            start = end + 1
+    if size:
+        yield finish_line()
+
+
+async def _iter_ndjson(byte_chunks, max_row_bytes: int = MAX_ROW_BYTES):
+    # Yields (row_number, dict) or (row_number, error message); blank lines are skipped
+    row_number = 0
+    async for line, _ in _iter_lines(byte_chunks, max_row_bytes):
+        if line is not TOO_LONG and not line.strip():
+            continue
+        row_number += 1
+        if line is TOO_LONG:
+            yield row_number, _too_long_error(max_row_bytes)
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {e}"
+            continue
+        yield row_number, record if isinstance(record, dict) else "Each line must be a JSON object."
+
+
+async def _iter_csv(byte_chunks, max_row_bytes: int = MAX_ROW_BYTES):
+    # Yields (row_number, dict) or (row_number, error message). The first record is the header.
+    # Lines are joined until quotes balance so quoted fields may contain newlines; quote
+    # parity is tracked per line, so each line is scanned once. A record over
+    # max_row_bytes is reported and parsing resumes at the next line.
+    header = None
+    row_number = 0
+    record = [] # Lines of the current record
+    record_size = 0
+    quotes_open = False
+    async for line, size in _iter_lines(byte_chunks, max_row_bytes):
+        record_size += size + (1 if record_size else 0)
+        if line is TOO_LONG or record_size > max_row_bytes:
+            row_number += 1
+            yield row_number, _too_long_error(max_row_bytes)
+            record, record_size, quotes_open = [], 0, False
+            continue
+        record.append(line)
+        quotes_open ^= line.count('"') % 2 == 1
+        if quotes_open:
+            continue
+        text_record = "\n".join(record)
+        record, record_size = [], 0
+        if not text_record.strip():
+            continue
+        values = next(csv.reader([text_record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, f"Expected {len(header)} columns, got {len(values)}."
+            continue
+        row = {name: (value if value != "" else None) for name, value in zip(header, values)}
+        if row.get("uses") is not None:
+            row["uses"] = [use.strip() for use in row["uses"].split(CSV_USES_SEPARATOR) if use.strip()]
+        yield row_number, row
+    if record:
+        row_number += 1
+        yield row_number, "Unterminated quoted field."
+
+
+def _validate(record):
+    try:
+        return schemas.PlantCreate(**record), None
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+async def _import_chunk(db, chunk, write, summary):
+    # chunk: list of (row_number, PlantCreate). One lookup + one INSERT + one commit per chunk.
+    common_names = [plant.common_name for _, plant in chunk]
+    scientific_names = [plant.scientific_name for _, plant in chunk if plant.scientific_name]
+
+    existing = (await db.execute(
+        text("""
+            SELECT common_name, scientific_name FROM plants
+            WHERE common_name = ANY(:common_names) OR scientific_name = ANY(:scientific_names);
+        """),
+        {"common_names": common_names, "scientific_names": scientific_names}
+    )).fetchall()
+    taken_common = {row.common_name for row in existing}
+    taken_scientific = {row.scientific_name for row in existing if row.scientific_name}
+
+    to_insert = []
+    for row_number, plant in chunk:
+        if plant.common_name in taken_common:
+            conflict = f"Plant with common name '{plant.common_name}' already exists."
+        elif plant.scientific_name and plant.scientific_name in taken_scientific:
+            conflict = f"Plant with scientific name '{plant.scientific_name}' already exists."
+        else:
+            conflict = None
+        if conflict:
+            summary["conflict"] += 1
+            write({"row": row_number, "status": "conflict", "detail": conflict})
+            continue
+        # Duplicates inside the same upload conflict with the first occurrence
+        taken_common.add(plant.common_name)
+        if plant.scientific_name:
+            taken_scientific.add(plant.scientific_name)
+        to_insert.append((row_number, plant))
+
+    if not to_insert:
+        return
+
+    params = {}
+    values_sql = []
+    for i, (_, plant) in enumerate(to_insert):
+        values_sql.append("(" + ", ".join(f":{column}_{i}" for column in PLANT_COLUMNS) + ")")
+        params.update({
+            f"common_name_{i}": plant.common_name,
+            f"scientific_name_{i}": plant.scientific_name,
+            f"description_{i}": plant.description,
+            f"uses_{i}": plant.uses,
+            f"region_{i}": plant.region,
+            f"plant_type_{i}": plant.plant_type,
+            f"image_url_{i}": str(plant.image_url) if plant.image_url else None,
+            f"three_d_model_url_{i}": str(plant.three_d_model_url) if plant.three_d_model_url else None,
+        })
+
+    # ON CONFLICT DO NOTHING covers rows inserted concurrently since the lookup above
+    # (relies on the unique indexes from migrations/003_plant_unique_names.sql).
+    inserted = (await db.execute(
+        text(f"""
+            INSERT INTO plants ({", ".join(PLANT_COLUMNS)})
+            VALUES {", ".join(values_sql)}
+            ON CONFLICT DO NOTHING
+            RETURNING plant_id, common_name;
+        """),
+        params
+    )).fetchall()
+    await db.commit()
+
+    inserted_ids = {row.common_name: row.plant_id for row in inserted}
+    for row_number, plant in to_insert:
+        plant_id = inserted_ids.get(plant.common_name)
+        if plant_id is None:
+            summary["conflict"] += 1
+            write({"row": row_number, "status": "conflict", "detail": "Plant was created concurrently by another request."})
+        else:
+            summary["inserted"] += 1
+            write({"row": row_number, "status": "inserted", "plant_id": plant_id})
+
+
+async def import_plants(db, byte_chunks, fmt: str, write, chunk_size: int = CHUNK_SIZE) -> dict:
+    # byte_chunks: async iterator of raw upload bytes. write: callback receiving one dict per input row.
+    # Returns summary counts. Chunks already committed stay committed if a later chunk fails.
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt}', expected one of {FORMATS}.")
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+    records = _iter_csv(byte_chunks) if fmt == "csv" else _iter_ndjson(byte_chunks)
+
+    summary = {"inserted": 0, "conflict": 0, "invalid": 0}
+    chunk = []
+    async for row_number, record in records:
+        plant, error = _validate(record) if isinstance(record, dict) else (None, record)
+        if error:
+            summary["invalid"] += 1
+            write({"row": row_number, "status": "invalid", "detail": error})
+            continue
+        chunk.append((row_number, plant))
+        if len(chunk) >= chunk_size:
+            await _import_chunk(db, chunk, write, summary)
+            chunk = []
+    if chunk:
+        await _import_chunk(db, chunk, write, summary)
+    return summary
+
+
+async def _read_file(path, block_size=64 * 1024):
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            yield block
+
+
+async def _main(args):
+    def write(entry):
+        sys.stdout.write(json.dumps(entry) + "\n")
+
+    async with async_session() as db:
+        summary = await import_plants(db, _read_file(args.path), args.format, write, args.chunk_size)
+        await facets.refresh_view(db)
+    write({"summary": summary})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import plants from an NDJSON or CSV file.")
+    parser.add_argument("path", help="file to import")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per INSERT/commit")
+    args = parser.parse_args()
+    if args.format is None:
+        args.format = "csv" if args.path.lower().endswith(".csv") else "ndjson"
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
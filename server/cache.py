@@ -0,0 +1,187 @@
+# server/cache.py
+# Small in-process caches for read-mostly data (plant catalog, AI responses).
+#
+# Entries are evicted least-recently-used once `maxsize` is reached and expire
+# after `ttl` seconds, so memory stays bounded and other workers/pods (which
+# keep their own copy) converge within one TTL after a write.
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object() # Sentinel so cached falsy values (e.g. an empty page) still count as hits
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock() # Sync endpoints run on FastAPI's threadpool
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def count_hit(self):
+        # A lookup answered without calling get(), e.g. a coalesced follower
+        with self._lock:
+            self.hits += 1
+
+    def keys(self) -> list:
+        # Snapshot of the current keys (may include expired entries)
+        with self._lock:
+            return list(self._data)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SingleFlightCache:
+    # TTLCache in front of an async computation, with in-flight request coalescing:
+    # concurrent misses for the same key share ONE call to `compute` instead of
+    # each calling upstream. Only successful results are cached.
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.cache = TTLCache(name, maxsize, ttl)
+        self._inflight = {} # key -> asyncio.Future of the call in progress
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key, compute):
+        # In-flight calls are checked first so a follower counts as a hit, not a miss:
+        # the value is cached in the same step that resolves the future, so a key is
+        # never both cached and in flight.
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            self.cache.count_hit()
+            try:
+                # shield: a cancelled follower must not cancel the shared call
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not inflight.cancelled() or getattr(task, "cancelling", lambda: 0)():
+                    raise
+            # The leader was cancelled (its client went away), not this caller: take over
+            return await self.get_or_compute(key, compute)
+
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.upstream_calls += 1
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # Mark retrieved so asyncio does not log it when nobody was waiting
+            raise
+        else:
+            self.cache.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        stats = self.cache.stats() # hits include coalesced followers
+        stats.update({
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "upstream_calls_saved": stats["hits"],
+        })
+        return stats
+
+
+# Single-plant lookups for GET /plants/{plant_id}
+plant_cache = TTLCache(
+    "plants",
+    maxsize=int(os.getenv("PLANT_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("PLANT_CACHE_TTL_SECONDS", "300")),
+)
+
+# List/search result pages for GET /plants/, keyed on the query parameters
+plant_list_cache = TTLCache(
+    "plant_pages",
+    maxsize=int(os.getenv("PLANT_LIST_CACHE_SIZE", "500")),
+    ttl=float(os.getenv("PLANT_LIST_CACHE_TTL_SECONDS", "60")),
+)
+
+# Facet counts for GET /plants/facets, keyed on the filters. Also cleared after
+# each plant_facets refresh (see server/facets.py).
+facet_cache = TTLCache(
+    "plant_facets",
+    maxsize=int(os.getenv("FACET_CACHE_SIZE", "200")),
+    ttl=float(os.getenv("FACET_CACHE_TTL_SECONDS", "60")),
+)
+
+# Top related plant ids per plant for GET /plants/{plant_id}/related. Recommendations
+# may lag bookmark writes by up to the TTL; the ids are resolved through plant_cache.
+related_plants_cache = TTLCache(
+    "related_plants",
+    maxsize=int(os.getenv("RELATED_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("RELATED_CACHE_TTL_SECONDS", "60")),
+)
+
+
+
+def invalidate_plants(plant_id=None):
+    # Write-through invalidation after the catalog changes. A new plant can appear
+    # on any list/search page, so every cached page is dropped.
+    plant_list_cache.clear()
+    facet_cache.clear()
+    if plant_id is not None:
+        plant_cache.pop(plant_id)
+    else:
+        plant_cache.clear()
+
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (plant_cache, plant_list_cache, facet_cache, related_plants_cache)}
@@ -0,0 +1,82 @@
+# server/compression.py
+# Response compression: brotli when the client accepts it and the optional `brotli`
+# package is installed, gzip otherwise. Built on Starlette's GZipMiddleware responders.
+#
+# Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as is. Streaming
+# progress responses (SSE chat and job events, NDJSON batch results and import
+# reports) are never compressed: a compressor holds data back until its buffer
+# fills, which would delay each event or line.
+import os
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+
+try:
+    import brotli
+except ImportError: # Optional: gzip only
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5")) # 0-11; higher is smaller but much slower
+
+UNCOMPRESSED_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+class _StreamingExclusion:
+    # Starlette only excludes text/event-stream; extend that check to NDJSON streams
+    async def send_with_compression(self, message):
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_compression(message)
+            if content_type.startswith(UNCOMPRESSED_CONTENT_TYPES):
+                self.content_type_is_excluded = True
+            return
+        await super().send_with_compression(message)
+
+
+class _GZipResponder(_StreamingExclusion, GZipResponder):
+    pass
+
+
+class _BrotliResponder(_StreamingExclusion, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        if not more_body:
+            compressed += self.compressor.finish()
+        return compressed
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    # "gzip, deflate, br;q=0.9" -> True for "br"; "br;q=0" -> False
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            responder = _BrotliResponder(self.app, self.minimum_size, BROTLI_QUALITY)
+        elif _accepts(accept_encoding, "gzip"):
+            responder = _GZipResponder(self.app, self.minimum_size, compresslevel=GZIP_LEVEL)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -0,0 +1,62 @@
+# server/config.py
+# Startup configuration, read from the environment and validated once.
+#
+# get_settings() is called on first use (first DB session, first Gemini call, app
+# setup), not at import, so importing the app stays cheap and a missing variable
+# is reported once with a clear error. Tuning knobs (cache sizes, AI limits, ...)
+# stay next to the code they tune.
+import os
+from functools import lru_cache
+
+POSTGRES_VARS = ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB", "POSTGRES_HOST", "POSTGRES_PORT")
+
+
+def _env_flag(environ, name: str, default: str) -> bool:
+    return environ.get(name, default).strip().lower() in ("1", "true", "yes")
+
+
+class Settings:
+    def __init__(self, environ=os.environ):
+        self.postgres_user = environ.get("POSTGRES_USER")
+        self.postgres_password = environ.get("POSTGRES_PASSWORD")
+        self.postgres_db = environ.get("POSTGRES_DB")
+        self.postgres_host = environ.get("POSTGRES_HOST")
+        self.postgres_port = environ.get("POSTGRES_PORT")
+        # DB_ASYNC=true (default): asyncpg engine; false: psycopg2 on the threadpool
+        self.db_async = _env_flag(environ, "DB_ASYNC", "true")
+
+        # Connection pool, per engine and per worker process. Keep
+        # (pool_size + max_overflow) x workers x pods below the server's max_connections.
+        self.db_pool_size = int(environ.get("DB_POOL_SIZE", "5"))
+        self.db_max_overflow = int(environ.get("DB_MAX_OVERFLOW", "10"))
+        self.db_pool_recycle_seconds = int(environ.get("DB_POOL_RECYCLE_SECONDS", "1800")) # Below RDS/proxy idle timeouts
+        self.db_pool_timeout_seconds = float(environ.get("DB_POOL_TIMEOUT_SECONDS", "10")) # Max wait for a pooled connection
+        self.db_statement_timeout_ms = int(environ.get("DB_STATEMENT_TIMEOUT_MS", "15000")) # 0 disables
+
+        self.gemini_api_key = environ.get("GEMINI_API_KEY")
+
+        # Comma-separated; unset or empty means no cross-origin access
+        self.cors_origins = [origin.strip() for origin in environ.get("CORS_ORIGINS", "").split(",") if origin.strip()]
+
+        # /readyz: the database check result is reused for READY_CACHE_SECONDS, so
+        # probes hit Postgres at most once per interval per worker
+        self.ready_cache_seconds = float(environ.get("READY_CACHE_SECONDS", "5"))
+        self.ready_timeout_seconds = float(environ.get("READY_TIMEOUT_SECONDS", "2"))
+
+    def check_database(self):
+        # Raise if any PostgreSQL variable is missing
+        missing_vars = [name for name in POSTGRES_VARS if not getattr(self, name.lower())]
+        if missing_vars:
+            raise RuntimeError(f"Missing one or more PostgreSQL environment variables: {', '.join(missing_vars)}")
+
+    def database_url(self, driver: str = "postgresql") -> str:
+        self.check_database()
+        return (
+            f"{driver}://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
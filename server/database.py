@@ -34,46 +34,129 @@ def get_db():
 # server/database.py
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-import os # Import os to use environment variables
-#from dotenv import load_dotenv # REMOVE or COMMENT THIS LINE WHEN RUNNING WITH DOCKER COMPOSE
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import threading
 
-#load_dotenv() # REMOVE or COMMENT THIS LINE WHEN RUNNING WITH DOCKER COMPOSE
+from .config import get_settings
+from .db_pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument
+from .metrics import instrument_engine
 
-POSTGRES_USER = os.getenv("POSTGRES_USER")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+# Engines and session factories are created on first use, not at import: importing
+# the app stays fast and does not need the POSTGRES_* variables until a session is opened.
+_engine = None
+_SessionLocal = None
+_async_engine = None
+_AsyncSessionLocal = None
+_lock = threading.Lock() # get_db() can be first called from several threadpool workers
 
-# --- IMPORTANT: Add a validation check for all variables ---
-if not all([POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_DB, POSTGRES_HOST, POSTGRES_PORT]):
-    missing_vars = [name for name, value in {
-        "POSTGRES_USER": POSTGRES_USER,
-        "POSTGRES_PASSWORD": POSTGRES_PASSWORD,
-        "POSTGRES_DB": POSTGRES_DB,
-        "POSTGRES_HOST": POSTGRES_HOST,
-        "POSTGRES_PORT": POSTGRES_PORT
-    }.items() if value is None]
-    raise RuntimeError(f"Missing one or more PostgreSQL environment variables: {', '.join(missing_vars)}")
-
-DATABASE_URL = (
-    f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-)
-print(f"Database URL constructed: {DATABASE_URL}") # Add this print for debugging confirmation
 
-print("hello")
-# Create the SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL, pool_pre_ping=True
-)
+def _pool_options(settings) -> dict:
+    # Pool sizing from the DB_POOL_* settings (see server/config.py and server/db_pool.py)
+    return {
+        "pool_pre_ping": True,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
+
+
+def get_engine():
+    # Sync psycopg2 engine (DB_ASYNC=false, CLI tools, benchmarks)
+    global _engine, _SessionLocal
+    with _lock:
+        if _engine is None:
+            settings = get_settings()
+            # statement_timeout is set per connection, so a runaway query cannot hold a pooled connection forever
+            connect_args = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"} if settings.db_statement_timeout_ms else {}
+            _engine = create_engine(
+                settings.database_url(), poolclass=InstrumentedQueuePool, connect_args=connect_args, **_pool_options(settings)
+            )
+            instrument(_engine, "sync")
+            instrument_engine(_engine, "sync")
+            _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+        return _engine
+
+
+def get_sessionmaker():
+    get_engine()
+    return _SessionLocal
 
-# Create a SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Dependency to get a database session
 def get_db():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Async database path ---
+# DB_ASYNC=true (default) serves the async endpoints from an asyncpg engine, so
+# waiting on Postgres does not occupy a threadpool worker. DB_ASYNC=false keeps
+# the psycopg2 engine above and runs each statement on the threadpool instead.
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    with _lock:
+        if _async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            settings = get_settings()
+            connect_args = {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}} if settings.db_statement_timeout_ms else {}
+            _async_engine = create_async_engine(
+                settings.database_url("postgresql+asyncpg"),
+                poolclass=InstrumentedAsyncAdaptedQueuePool,
+                connect_args=connect_args,
+                **_pool_options(settings)
+            )
+            instrument(_async_engine.sync_engine, "async")
+            instrument_engine(_async_engine.sync_engine, "async")
+            # expire_on_commit=False: rows returned with RETURNING stay readable after commit
+            _AsyncSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False)
+        return _async_engine
+
+
+def get_async_sessionmaker():
+    get_async_engine()
+    return _AsyncSessionLocal
+
+
+class SyncSessionAdapter:
+    # Gives a sync Session the awaitable execute/commit/rollback/close interface of
+    # AsyncSession so endpoints have a single code path in both DB modes.
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, statement, params=None):
+        return await run_in_threadpool(self._session.execute, statement, params)
+
+    async def commit(self):
+        await run_in_threadpool(self._session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self._session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self._session.close)
+
+
+# Async session for code outside request dependencies (CLI tools, background tasks)
+@asynccontextmanager
+async def async_session():
+    if get_settings().db_async:
+        async with get_async_sessionmaker()() as db:
+            yield db
+    else:
+        db = SyncSessionAdapter(get_sessionmaker()())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+# Async dependency to get a database session (AsyncSession, or the adapter when DB_ASYNC=false)
+async def get_async_db():
+    async with async_session() as db:
+        yield db
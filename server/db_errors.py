@@ -0,0 +1,49 @@
+# server/db_errors.py
+# Map Postgres constraint violations to HTTP errors.
+#
+# Write paths rely on constraints (primary keys, unique indexes, foreign keys)
+# instead of "check first, then write" queries, so the constraint that fired tells
+# us which HTTP error to return. Works for both psycopg2 and asyncpg errors.
+from fastapi import HTTPException, status
+from sqlalchemy.exc import DBAPIError
+
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+# constraint name -> (status code, detail). Names are the Postgres defaults for the
+# foreign keys and the indexes created in server/migrations/.
+CONSTRAINT_ERRORS = {
+    "bookmarks_user_google_id_fkey": (status.HTTP_404_NOT_FOUND, "User not found."),
+    "bookmarks_plant_id_fkey": (status.HTTP_404_NOT_FOUND, "Plant not found."),
+    "bookmarks_user_plant_key": (status.HTTP_409_CONFLICT, "This plant is already bookmarked by this user."),
+    "plants_common_name_key": (status.HTTP_409_CONFLICT, "A plant with this common name already exists."),
+    "plants_scientific_name_key": (status.HTTP_409_CONFLICT, "A plant with this scientific name already exists."),
+}
+
+# Fallbacks when the constraint is not listed above
+SQLSTATE_ERRORS = {
+    UNIQUE_VIOLATION: (status.HTTP_409_CONFLICT, "Resource already exists."),
+    FOREIGN_KEY_VIOLATION: (status.HTTP_404_NOT_FOUND, "Referenced resource not found."),
+}
+
+
+def pg_error_info(exc: DBAPIError):
+    # Returns (sqlstate, constraint_name); either may be None
+    orig = getattr(exc, "orig", None)
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    diag = getattr(orig, "diag", None) # psycopg2
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint is None:
+        # asyncpg: SQLAlchemy's adapted error wraps the asyncpg exception
+        constraint = getattr(getattr(orig, "__cause__", None), "constraint_name", None)
+    return sqlstate, constraint
+
+
+def constraint_http_error(exc: DBAPIError):
+    # HTTPException for a known constraint violation, or None so the caller can re-raise
+    sqlstate, constraint = pg_error_info(exc)
+    mapped = CONSTRAINT_ERRORS.get(constraint) or SQLSTATE_ERRORS.get(sqlstate)
+    if mapped is None:
+        return None
+    status_code, detail = mapped
+    return HTTPException(status_code=status_code, detail=detail)
@@ -0,0 +1,146 @@
+# server/db_pool.py
+# Instrumented SQLAlchemy connection pools for the sync and async engines.
+#
+# Records how long requests wait for a pooled connection (the time spent in the
+# pool's _do_get, i.e. queued behind other requests when every connection is busy),
+# checkout timeouts, connections in use and overflow use (checkouts served while
+# more than DB_POOL_SIZE connections are in use). GET /stats/pool reports them per
+# engine so the pool can be sized against the database's real connection limit
+# (per worker process: multiply by workers x pods when comparing with RDS max_connections).
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.connects = 0
+        self.overflow_checkouts = 0 # Checkouts while more than pool_size connections were in use
+        self.invalidations = 0
+        self.waits = 0 # Checkouts that waited longer than 1 ms
+        self.wait_seconds_total = 0.0
+        self._wait_samples = deque(maxlen=2000) # Recent checkout waits, seconds
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._wait_samples.append(seconds)
+            self.wait_seconds_total += seconds
+            if seconds > 0.001:
+                self.waits += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "connects": self.connects,
+                "overflow_checkouts": self.overflow_checkouts,
+                "invalidations": self.invalidations,
+                "checkouts_waited": self.waits,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 1),
+            }
+        if samples:
+            stats["wait_ms"] = {
+                "p50": round(samples[len(samples) // 2] * 1000, 3),
+                "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+                "max": round(samples[-1] * 1000, 3),
+            }
+        return stats
+
+
+class _InstrumentedPoolMixin:
+    stats = None # PoolStats, set by instrument()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines = {} # name -> sync Engine (for async engines, their .sync_engine)
+
+
+def instrument(engine, name: str):
+    # Attach PoolStats and event hooks to an engine created with an Instrumented*Pool
+    stats = PoolStats(name)
+    pool = engine.pool
+    pool.stats = stats
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with stats._lock:
+            stats.checkouts += 1
+            stats.in_use += 1
+            stats.max_in_use = max(stats.max_in_use, stats.in_use)
+            if stats.in_use > engine.pool.size():
+                stats.overflow_checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.in_use = max(stats.in_use - 1, 0)
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with stats._lock:
+            stats.invalidations += 1
+
+    _engines[name] = engine
+    return stats
+
+
+def pool_stats() -> dict:
+    report = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        report[name] = {
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "recycle_seconds": pool._recycle,
+            "idle": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            **pool.stats.snapshot(),
+        }
+    return report
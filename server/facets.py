@@ -0,0 +1,158 @@
+# server/facets.py
+# Structured plant filters (region, plant_type, uses) and facet counts for
+# GET /plants/ and GET /plants/facets. Relies on the indexes and the plant_facets
+# materialized view from migrations/006_plant_facets.sql.
+#
+# Catalog-wide counts are read from plant_facets instead of a GROUP BY over every
+# plant. After a plant write the API calls schedule_refresh(), which runs
+# REFRESH MATERIALIZED VIEW CONCURRENTLY in the background at most once every
+# FACETS_REFRESH_SECONDS, so a burst of writes (e.g. a bulk import) costs one refresh.
+# Counts for a filtered or searched listing are aggregated over the matching
+# subset only, which the filter indexes narrow down first.
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+from .cache import facet_cache
+from .database import async_session
+
+logger = logging.getLogger(__name__)
+
+FACETS = ("region", "plant_type", "uses")
+FACET_LIMIT = int(os.getenv("FACET_LIMIT", "50")) # Values returned per facet, most common first
+FACETS_REFRESH_SECONDS = float(os.getenv("FACETS_REFRESH_SECONDS", "5"))
+
+VIEW_QUERY = text("SELECT facet, value, plant_count FROM plant_facets;")
+REFRESH_QUERY = text("REFRESH MATERIALIZED VIEW CONCURRENTLY plant_facets;")
+
+
+def filter_sql(region=None, plant_type=None, uses=None):
+    # Returns (" AND ..." SQL fragment, params) for the structured filters.
+    # Exact matches, so the btree indexes on region/plant_type and the GIN index on uses apply.
+    sql = ""
+    params = {}
+    if region:
+        sql += " AND region = :region"
+        params["region"] = region
+    if plant_type:
+        sql += " AND plant_type = :plant_type"
+        params["plant_type"] = plant_type
+    if uses:
+        sql += " AND uses @> CAST(:uses AS TEXT[])"
+        params["uses"] = list(uses)
+    return sql, params
+
+
+def normalize_filters(region=None, plant_type=None, uses=None):
+    # Strips blanks and de-duplicates uses (order-independent), so equivalent
+    # requests share cache entries
+    region = region.strip() if region and region.strip() else None
+    plant_type = plant_type.strip() if plant_type and plant_type.strip() else None
+    uses = tuple(sorted({use.strip() for use in uses or () if use.strip()})) or None
+    return region, plant_type, uses
+
+
+def subset_query(where_sql: str):
+    # Facet counts over the plants matching `where_sql` (" AND ..." fragments)
+    return text(f"""
+        WITH matched AS (
+            SELECT plant_id, region, plant_type, uses FROM plants WHERE 1=1 {where_sql}
+        )
+        SELECT 'total' AS facet, '' AS value, COUNT(*) AS plant_count FROM matched
+        UNION ALL
+        SELECT 'region', region, COUNT(*) FROM matched WHERE region IS NOT NULL GROUP BY region
+        UNION ALL
+        SELECT 'plant_type', plant_type, COUNT(*) FROM matched WHERE plant_type IS NOT NULL GROUP BY plant_type
+        UNION ALL
+        SELECT 'uses', use_name, COUNT(DISTINCT plant_id) FROM matched, UNNEST(uses) AS use_name
+            WHERE use_name IS NOT NULL GROUP BY use_name;
+    """)
+
+
+def build_facets(rows) -> dict:
+    # (facet, value, plant_count) rows -> {"total": n, "region": [{"value", "count"}, ...], ...}
+    facets = {"total": 0, **{name: [] for name in FACETS}}
+    for row in rows:
+        if row.facet == "total":
+            facets["total"] = row.plant_count
+        else:
+            facets[row.facet].append({"value": row.value, "count": row.plant_count})
+    for name in FACETS:
+        facets[name].sort(key=lambda entry: (-entry["count"], entry["value"]))
+        del facets[name][FACET_LIMIT:]
+    return facets
+
+
+async def read_facets(db, where_sql: str = "", params=None) -> dict:
+    if not where_sql:
+        rows = (await db.execute(VIEW_QUERY)).fetchall()
+    else:
+        rows = (await db.execute(subset_query(where_sql), params or {})).fetchall()
+    return build_facets(rows)
+
+
+async def refresh_view(db):
+    await db.execute(REFRESH_QUERY)
+    await db.commit()
+
+
+class FacetRefresher:
+    # Coalesces refresh requests: at most one refresh runs at a time, and at most
+    # one every `min_interval` seconds. A write during a refresh triggers one more.
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._task = None
+        self._pending = False
+        self._last_refresh = 0.0 # time.monotonic()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+
+    def schedule(self):
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            delay = self._last_refresh + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._pending = False
+            try:
+                async with async_session() as db:
+                    await refresh_view(db)
+                self.refreshes += 1
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.exception("plant_facets refresh failed")
+            self._last_refresh = time.monotonic()
+            facet_cache.clear()
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "pending": self._pending,
+            "last_error": self.last_error,
+        }
+
+
+refresher = FacetRefresher(FACETS_REFRESH_SECONDS)
+
+
+def schedule_refresh():
+    refresher.schedule()
@@ -0,0 +1,55 @@
+# server/health.py
+# Readiness check behind GET /readyz.
+#
+# Kubernetes probes every pod every few seconds. The database check result is
+# reused for READY_CACHE_SECONDS and concurrent probes share one check in flight,
+# so probes reach Postgres at most once per interval per worker, and a hung
+# connection fails the probe after READY_TIMEOUT_SECONDS instead of hanging it.
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from .config import get_settings
+from .database import async_session
+
+
+class ReadinessCheck:
+    def __init__(self, cache_seconds: float, timeout_seconds: float):
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self._result = None # (checked_at, ready, detail)
+        self._lock = None # Created lazily, inside the running event loop
+
+    async def _check_database(self):
+        async with async_session() as db:
+            await db.execute(text("SELECT 1"))
+
+    async def check(self):
+        # Returns (ready, detail), cached for cache_seconds
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            if self._result is not None and now - self._result[0] < self.cache_seconds:
+                return self._result[1], self._result[2]
+            try:
+                await asyncio.wait_for(self._check_database(), self.timeout_seconds)
+                ready, detail = True, {"database": "connected"}
+            except asyncio.TimeoutError:
+                ready, detail = False, {"database": "timeout", "timeout_seconds": self.timeout_seconds}
+            except Exception as e:
+                ready, detail = False, {"database": "failed", "error": str(e)}
+            self._result = (time.monotonic(), ready, detail)
+            return ready, detail
+
+
+_readiness = None
+
+
+def get_readiness() -> ReadinessCheck:
+    global _readiness
+    if _readiness is None:
+        settings = get_settings()
+        _readiness = ReadinessCheck(settings.ready_cache_seconds, settings.ready_timeout_seconds)
+    return _readiness
@@ -0,0 +1,92 @@
+# server/http_cache.py
+# HTTP validators and Cache-Control for the plant read endpoints.
+#
+# Responses carry a weak ETag and Last-Modified derived from the catalog version
+# (migrations/007_catalog_version.sql), which a trigger bumps on every write to plants.
+# The version is read with one primary-key lookup and reused for
+# CATALOG_VERSION_TTL_SECONDS; a matching If-None-Match (or If-Modified-Since) gets
+# a 304 before the plant query, the page cache or serialization run. A single plant
+# is looked up first (usually a cache hit), so a missing one is a 404, never a 304.
+#
+# Seeing a new version also drops this worker's plant caches, so a worker never
+# labels a page cached before another worker's write with the new ETag.
+# Weak ETags stay valid across gzip/brotli encodings of the same JSON.
+import os
+import time
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+from sqlalchemy import text
+
+from .cache import invalidate_plants
+
+CATALOG_VERSION_TTL_SECONDS = float(os.getenv("CATALOG_VERSION_TTL_SECONDS", "2"))
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", "60"))
+CATALOG_STALE_SECONDS = int(os.getenv("CATALOG_STALE_SECONDS", "300")) # stale-while-revalidate
+
+# Browsers and the nginx/CDN layer may keep a page for max-age, then revalidate with If-None-Match
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE_SECONDS}, stale-while-revalidate={CATALOG_STALE_SECONDS}"
+
+VERSION_QUERY = text("SELECT version, updated_at FROM catalog_version;")
+
+
+class CatalogVersion:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value = None # (version, updated_at)
+        self._fetched_at = 0.0 # time.monotonic()
+
+    async def get(self, db):
+        # Returns (version, updated_at), from the database at most once per ttl
+        if self._value is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return self._value
+        row = (await db.execute(VERSION_QUERY)).first()
+        value = (row.version, row.updated_at.astimezone(timezone.utc))
+        if self._value is not None and value[0] != self._value[0]:
+            invalidate_plants() # Another worker or pod changed the catalog
+        self._value = value
+        self._fetched_at = time.monotonic()
+        return value
+
+    def invalidate(self):
+        # After a local write: re-read on the next request
+        self._fetched_at = 0.0
+
+
+catalog_version = CatalogVersion(CATALOG_VERSION_TTL_SECONDS)
+
+
+def _etag(version: int) -> str:
+    return f'W/"catalog-{version}"'
+
+
+def _not_modified(request: Request, etag: str, updated_at) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since; weak comparison
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since.tzinfo is not None and updated_at.replace(microsecond=0) <= since
+    return False
+
+
+async def conditional(request: Request, response: Response, db):
+    # Sets the validators and Cache-Control on `response`. Returns a 304 Response when
+    # the client's copy is current (the endpoint should return it as is), else None.
+    version, updated_at = await catalog_version.get(db)
+    headers = {
+        "ETag": _etag(version),
+        "Last-Modified": format_datetime(updated_at, usegmt=True),
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+    }
+    if _not_modified(request, headers["ETag"], updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
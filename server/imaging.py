@@ -0,0 +1,234 @@
+# server/imaging.py
+# Image preprocessing for /identify-plant/.
+#
+# Upload request bodies are capped while they stream in, before multipart parsing
+# (UploadLimitMiddleware); each file is then read with a hard size cap, decoded, EXIF-oriented, downscaled
+# and re-encoded as JPEG in a process pool so Pillow never blocks the event loop.
+# The same worker computes a 64-bit perceptual hash (dHash) that keys a cache of
+# identification results: a repeat photo of the same plant (re-sent, resized or
+# re-compressed) skips the model call entirely.
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, UploadFile, status
+
+from .cache import TTLCache, MISSING
+from .metrics import image_latency, timed
+
+MAX_UPLOAD_BYTES = int(os.getenv("IDENTIFY_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IDENTIFY_BATCH_MAX_IMAGES = int(os.getenv("IDENTIFY_BATCH_MAX_IMAGES", "10"))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024 # Boundaries and part headers on top of the image bytes
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1024")) # Longest side sent to the model, in pixels
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "4")) # Max differing bits (of 64) for a cache hit
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ImageRejected(ValueError):
+    # The upload could not be decoded as an image
+    pass
+
+
+# POST path -> largest accepted request body, multipart framing included
+UPLOAD_BODY_LIMITS = {
+    "/identify-plant/": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/identify-plant/jobs": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/identify-plant/batch": IDENTIFY_BATCH_MAX_IMAGES * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES),
+}
+
+
+def _too_large(limit: int, what: str = "Image") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"{what} exceeds the {limit} byte limit.")
+
+
+class UploadLimitMiddleware:
+    # Starlette parses (and spools to disk) the whole multipart body before the
+    # endpoint runs, so a per-file check alone comes too late. For upload routes
+    # this rejects a declared Content-Length over the limit before reading any of
+    # the body, and counts the bytes actually received otherwise (chunked uploads,
+    # lying clients). The 413 is raised from receive(), i.e. inside form parsing,
+    # and FastAPI passes an HTTPException raised there through unchanged.
+    def __init__(self, app, limits: dict = UPLOAD_BODY_LIMITS):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        declared = int(content_length) if content_length and content_length.isdigit() else None
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            if declared is not None and declared > limit:
+                raise _too_large(limit, "Request body")
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(limit, "Request body")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def read_upload_limited(upload: UploadFile, limit: int = MAX_UPLOAD_BYTES) -> bytes:
+    # Per-file cap, behind UploadLimitMiddleware's cap on the whole request body.
+    # Reads the upload in chunks and stops with 413 as soon as it exceeds `limit`,
+    # instead of pulling an arbitrarily large file into memory first.
+    if upload.size is not None and upload.size > limit:
+        raise _too_large(limit)
+    buffer = bytearray()
+    while chunk := await upload.read(READ_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > limit:
+            raise _too_large(limit)
+    return bytes(buffer)
+
+
+def _dhash(img) -> int:
+    # Difference hash: compare neighbouring pixels of a 9x8 grayscale thumbnail
+    from PIL import Image
+
+    small = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def preprocess_image(data: bytes, max_side: int = IMAGE_MAX_SIDE, quality: int = IMAGE_JPEG_QUALITY):
+    # Runs in a worker process. Returns (jpeg_bytes, perceptual_hash).
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        # For JPEGs, let the decoder downscale while decoding (much cheaper than full-size decode + resize)
+        img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageRejected(f"Could not decode image: {e}")
+
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue(), _dhash(img)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+class ImageStats:
+    def __init__(self):
+        self.images = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.preprocess_seconds = 0.0
+
+    def record(self, bytes_in: int, bytes_out: int, seconds: float):
+        self.images += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.preprocess_seconds += seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "images_preprocessed": self.images,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "preprocess_ms_total": round(self.preprocess_seconds * 1000, 1),
+            "preprocess_ms_avg": round(self.preprocess_seconds * 1000 / self.images, 2) if self.images else 0.0,
+        }
+
+
+image_stats = ImageStats()
+
+
+async def prepare_image(data: bytes):
+    # Preprocess in the process pool. Returns (jpeg_bytes, perceptual_hash).
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        with timed(image_latency):
+            jpeg_bytes, phash = await loop.run_in_executor(_get_pool(), preprocess_image, data)
+    except BrokenProcessPool:
+        shutdown_pool() # A worker died (e.g. OOM on a huge image); start a fresh pool next time
+        raise
+    image_stats.record(len(data), len(jpeg_bytes), time.perf_counter() - start)
+    return jpeg_bytes, phash
+
+
+class PerceptualHashCache:
+    # Identification results keyed on the image's perceptual hash. An exact hash
+    # match is a dict lookup; otherwise the cached hashes are scanned for one within
+    # `max_distance` bits (a few thousand popcounts at most).
+    def __init__(self, maxsize: int, ttl: float, max_distance: int):
+        self.cache = TTLCache("identify", maxsize, ttl)
+        self.max_distance = max_distance
+        self.near_hits = 0
+
+    def get(self, phash: int):
+        value = self.cache.get(phash)
+        if value is not MISSING or self.max_distance <= 0:
+            return value
+        for key in self.cache.keys():
+            if (key ^ phash).bit_count() <= self.max_distance:
+                value = self.cache.get(key) # Counted as a hit
+                if value is not MISSING:
+                    self.near_hits += 1
+                    self.cache.misses -= 1 # ...so the exact-match lookup above was not a miss after all
+                    return value
+        return MISSING
+
+    def set(self, phash: int, value):
+        self.cache.set(phash, value)
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        stats["near_hits"] = self.near_hits
+        return stats
+
+
+identification_cache = PerceptualHashCache(
+    maxsize=int(os.getenv("IDENTIFY_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("IDENTIFY_CACHE_TTL_SECONDS", "86400")),
+    max_distance=PHASH_MAX_DISTANCE,
+)
+
+
+def imaging_stats() -> dict:
+    return {"preprocessing": image_stats.snapshot(), "identification_cache": identification_cache.stats()}
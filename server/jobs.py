@@ -0,0 +1,247 @@
+# server/jobs.py
+# Background job queue for slow work (plant identification).
+#
+# A client submits a payload and gets a job id back immediately; a bounded pool of
+# worker tasks processes the queue and the client polls or subscribes for the
+# result. Storage and queueing sit behind JobBackend so an external queue (Redis,
+# SQS, ...) can replace the in-process one without touching the endpoints.
+import asyncio
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+
+JOB_WORKERS = int(os.getenv("IDENTIFY_JOB_WORKERS", "4"))
+JOB_MAX_QUEUE = int(os.getenv("IDENTIFY_JOB_MAX_QUEUE", "100"))
+JOB_MAX_QUEUED_BYTES = int(os.getenv("IDENTIFY_JOB_MAX_QUEUED_BYTES", str(256 * 1024 * 1024))) # Raw uploads waiting in memory
+JOB_RESULT_TTL_SECONDS = float(os.getenv("IDENTIFY_JOB_RESULT_TTL_SECONDS", "600")) # How long finished jobs can be fetched
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class QueueFull(Exception):
+    # The backend cannot accept more work right now
+    pass
+
+
+class Job:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None # JSON-serializable dict on success
+        self.error = None # Message on failure
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobBackend(ABC):
+    # Queue + job store. Implementations must be safe to call from many coroutines.
+
+    @abstractmethod
+    async def submit(self, payload: bytes) -> Job:
+        # Store and enqueue a new job; raise QueueFull when at capacity
+        ...
+
+    @abstractmethod
+    async def next_job(self):
+        # Wait for the next queued job; returns (Job, payload) and marks it running
+        ...
+
+    @abstractmethod
+    async def finish(self, job_id: str, result: dict = None, error: str = None) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str):
+        # Job, or None if unknown/expired
+        ...
+
+    @abstractmethod
+    def depth(self) -> int:
+        # Jobs waiting to be picked up
+        ...
+
+    async def wait(self, job_id: str, timeout: float):
+        # Wait until the job changes state or `timeout` passes; returns the Job.
+        # Generic polling fallback; backends with notifications should override it.
+        await asyncio.sleep(min(timeout, 0.5))
+        return await self.get(job_id)
+
+
+class InProcessJobBackend(JobBackend):
+    # asyncio.Queue + dict. Jobs live only in this worker process, so clients must
+    # poll the same pod that accepted the job (fine for a single replica, or with
+    # sticky sessions); use an external backend otherwise.
+    def __init__(self, max_queue: int, max_queued_bytes: int, result_ttl: float, max_jobs: int = 10000):
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict() # job_id -> Job, oldest first
+        self._payloads = {} # job_id -> payload while queued
+        self._changed = {} # job_id -> asyncio.Event set on every state change
+        self.max_queued_bytes = max_queued_bytes
+        self.queued_bytes = 0
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+
+    def _prune(self):
+        # Drop finished jobs past their TTL, and the oldest finished ones beyond max_jobs
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            over_capacity = len(self._jobs) > self.max_jobs
+            if job.status in FINISHED_STATES and (over_capacity or now - job.finished_at > self.result_ttl):
+                del self._jobs[job_id]
+                self._changed.pop(job_id, None)
+            elif not over_capacity:
+                break
+
+    def _notify(self, job_id: str):
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def submit(self, payload: bytes) -> Job:
+        self._prune()
+        if self._queue.full() or self.queued_bytes + len(payload) > self.max_queued_bytes:
+            raise QueueFull()
+        job = Job(uuid.uuid4().hex)
+        self._jobs[job.job_id] = job
+        self._payloads[job.job_id] = payload
+        self.queued_bytes += len(payload)
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    async def next_job(self):
+        while True:
+            job_id = await self._queue.get()
+            payload = self._payloads.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if payload is None or job is None:
+                continue
+            self.queued_bytes -= len(payload)
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._notify(job_id)
+            return job, payload
+
+    async def finish(self, job_id: str, result: dict = None, error: str = None) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.status = FAILED if error is not None else SUCCEEDED
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        self._notify(job_id)
+
+    async def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def wait(self, job_id: str, timeout: float):
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._jobs.get(job_id)
+
+
+class JobManager:
+    # Runs `handler(payload) -> dict` on `workers` concurrent worker tasks
+    def __init__(self, backend: JobBackend, handler, workers: int):
+        self.backend = backend
+        self.handler = handler
+        self.workers = workers
+        self._tasks = []
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.busy = 0
+        self._queue_wait = deque(maxlen=1000) # seconds from submit to start, recent jobs
+        self._run_time = deque(maxlen=1000) # seconds from start to finish, recent jobs
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: bytes) -> Job:
+        try:
+            job = await self.backend.submit(payload)
+        except QueueFull:
+            self.rejected += 1
+            raise
+        self.submitted += 1
+        return job
+
+    async def _worker(self):
+        while True:
+            job, payload = await self.backend.next_job()
+            self.busy += 1
+            self._queue_wait.append(job.started_at - job.created_at)
+            try:
+                result = await self.handler(payload)
+            except asyncio.CancelledError:
+                await self.backend.finish(job.job_id, error="Server shutting down.")
+                raise
+            except Exception as e:
+                self.failed += 1
+                await self.backend.finish(job.job_id, error=str(getattr(e, "detail", e)))
+            else:
+                self.succeeded += 1
+                await self.backend.finish(job.job_id, result=result)
+            finally:
+                self.busy -= 1
+                self._run_time.append(time.time() - job.started_at)
+
+    @staticmethod
+    def _summary(samples) -> dict:
+        if not samples:
+            return {"count": 0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "queue_depth": self.backend.depth(),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "queue_wait": self._summary(self._queue_wait),
+            "run_time": self._summary(self._run_time),
+        }
@@ -1,29 +1,59 @@
 # server/main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Response, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List
+from datetime import datetime
+import asyncio
+import json
+import logging
 import os
+import tempfile
 #from dotenv import load_dotenv
 
-from .database import get_db, engine
-from . import schemas
+from .config import get_settings
+from .database import get_async_db
+from .db_pool import pool_stats
+from .metrics import METRICS_ENABLED, MetricsMiddleware, render_metrics
+from .compression import CompressionMiddleware
+from .http_cache import catalog_version, conditional
+from .health import get_readiness
+from . import schemas, search, bulk_import, ai_client, facets, typeahead, recommendations
+from .ai_client import AIClientError, ai_http_error, ai_client_stats
+from .cache import plant_cache, plant_list_cache, facet_cache, related_plants_cache, invalidate_plants, cache_stats, MISSING
+from .ai_cache import chat_response_cache, chat_cache_key
+from .imaging import (
+    IDENTIFY_BATCH_MAX_IMAGES, ImageRejected, UploadLimitMiddleware, identification_cache, imaging_stats,
+    prepare_image, read_upload_limited, shutdown_pool
+)
+from .db_errors import constraint_http_error
+from .pagination import decode_cursor, set_next_cursor, NEXT_CURSOR_HEADER
+from .serialization import json_response, plant_row_dict
+from .jobs import (
+    FINISHED_STATES, JOB_MAX_QUEUE, JOB_MAX_QUEUED_BYTES, JOB_RESULT_TTL_SECONDS, JOB_WORKERS,
+    InProcessJobBackend, JobManager, QueueFull
+)
 
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from fastapi import UploadFile, File
-from PIL import Image
-import io
 
 #load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# The Gemini SDK is configured on first use in ai_client.get_genai(), and Pillow is
+# only imported in the image workers, so importing this module stays fast.
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
-CORS_ORIGINS_STR = os.getenv("CORS_ORIGINS")
+
+# 413 for oversized image uploads while the body streams in, before multipart parsing
+# (see server/imaging.py). Added first, so it sits inside CORS and the 413 stays readable.
+app.add_middleware(UploadLimitMiddleware)
 
 # --- CORS Configuration ---
-origins = [origin.strip() for origin in CORS_ORIGINS_STR.split(',')]
+# From CORS_ORIGINS (comma-separated); unset means no cross-origin access
+origins = get_settings().cors_origins
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,22 +61,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER], # Lets browser clients read the keyset pagination cursor
 )
 # --- End CORS Configuration ---
 
+# gzip/brotli for responses over COMPRESSION_MIN_SIZE bytes (see server/compression.py)
+app.add_middleware(CompressionMiddleware)
+
+# Per-route request counts and latency for GET /metrics (added last, so it is outermost)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT_SECONDS: shed load with 503
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is busy, please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
+
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     db_status = {"database": "unreachable"} # Default status if something goes wrong
 
     try:
-        # Attempt to get a database session
-        with get_db() as db: # This uses the dependency to get a session
-            # Execute a simple query to test the connection
-            # The 'text("SELECT 1")' is a common, lightweight way to test connectivity
-            db.execute(text("SELECT 1"))
-            db_status = {"database": "connected"}
+        # The session connects lazily, so connection errors surface here and are reported below
+        # Execute a simple query to test the connection
+        # The 'text("SELECT 1")' is a common, lightweight way to test connectivity
+        await db.execute(text("SELECT 1"))
+        db_status = {"database": "connected"}
     except Exception as e:
         # If any exception occurs during DB connection or query, mark it as failed
         db_status = {"database": "failed", "error": str(e)}
@@ -62,6 +108,19 @@ async def health_check():
         }
     }
 
+@app.get("/livez")
+async def liveness_probe():
+    # Liveness: the process is up and serving; never touches dependencies, so a
+    # database outage does not get healthy pods restarted
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness_probe(response: Response):
+    # Readiness: 503 takes the pod out of the Service until the database is reachable again
+    ready, dependencies = await get_readiness().check()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not ready", "dependencies": dependencies}
 
 
 @app.get("/")
@@ -72,63 +131,54 @@ async def read_root():
 ## User Endpoints
 
 @app.post("/users/sync", response_model=schemas.User)
-def sync_user(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists
-    existing_user_query = text("SELECT google_id, email, first_name, last_name FROM users WHERE google_id = :google_id;")
-    existing_user = db.execute(existing_user_query, {"google_id": user_data.google_id}).first()
-
-    if existing_user:
-        # User exists, update only necessary fields (email, first_name, last_name)
-        update_query = text("""
-            UPDATE users
-            SET email = :email, first_name = :first_name, last_name = :last_name
-            WHERE google_id = :google_id
-            RETURNING google_id, email, first_name, last_name;
-        """)
-        try:
-            result = db.execute(update_query, {
-                "google_id": user_data.google_id,
-                "email": user_data.email,
-                "first_name": user_data.first_name,
-                "last_name": user_data.last_name
-            }).first()
-            db.commit()
-            return schemas.User(**result._asdict())
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error updating user: {e}")
-    else:
-        # User does not exist, create new user
-        insert_query = text("""
-            INSERT INTO users (google_id, email, first_name, last_name)
-            VALUES (:google_id, :email, :first_name, :last_name)
-            RETURNING google_id, email, first_name, last_name;
-        """)
-        try:
-            result = db.execute(insert_query, {
-                "google_id": user_data.google_id,
-                "email": user_data.email,
-                "first_name": user_data.first_name,
-                "last_name": user_data.last_name
-            }).first()
-            db.commit()
-            if result:
-                return schemas.User(**result._asdict())
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="User could not be created")
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating user: {e}")
+async def sync_user(user_data: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # Runs on every client login: one upsert round trip instead of SELECT + UPDATE/INSERT.
+    # ON CONFLICT also makes concurrent logins for the same google_id safe.
+    upsert_query = text("""
+        INSERT INTO users (google_id, email, first_name, last_name)
+        VALUES (:google_id, :email, :first_name, :last_name)
+        ON CONFLICT (google_id) DO UPDATE
+        SET email = EXCLUDED.email, first_name = EXCLUDED.first_name, last_name = EXCLUDED.last_name
+        RETURNING google_id, email, first_name, last_name;
+    """)
+    try:
+        result = (await db.execute(upsert_query, {
+            "google_id": user_data.google_id,
+            "email": user_data.email,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name
+        })).first()
+        await db.commit()
+    except DBAPIError as e:
+        await db.rollback()
+        raise constraint_http_error(e) or HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error syncing user: {e}")
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="User could not be synced")
+    return schemas.User(**result._asdict())
 
 @app.get("/users/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    query = text("SELECT google_id, email, first_name, last_name FROM users OFFSET :skip LIMIT :limit;")
-    result = db.execute(query, {"skip": skip, "limit": limit}).fetchall()
+async def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if after:
+        # Keyset pagination: seek past the last google_id instead of counting rows with OFFSET
+        (after_google_id,) = decode_cursor(after, (str,))
+        query = text("SELECT google_id, email, first_name, last_name FROM users WHERE google_id > :after_google_id ORDER BY google_id LIMIT :limit;")
+        result = (await db.execute(query, {"after_google_id": after_google_id, "limit": limit})).fetchall()
+    else:
+        query = text("SELECT google_id, email, first_name, last_name FROM users ORDER BY google_id OFFSET :skip LIMIT :limit;")
+        result = (await db.execute(query, {"skip": skip, "limit": limit})).fetchall()
+    set_next_cursor(response, result, limit, key=lambda row: (row.google_id,))
     return [schemas.User(**row._asdict()) for row in result]
 
 @app.get("/users/{google_id}", response_model=schemas.User)
-def read_user(google_id: str, db: Session = Depends(get_db)):
+async def read_user(google_id: str, db: AsyncSession = Depends(get_async_db)):
     query = text("SELECT google_id, email, first_name, last_name FROM users WHERE google_id = :google_id;")
-    result = db.execute(query, {"google_id": google_id}).first()
+    result = (await db.execute(query, {"google_id": google_id})).first()
     if result is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return schemas.User(**result._asdict())
@@ -137,12 +187,12 @@ def read_user(google_id: str, db: Session = Depends(get_db)):
 ## Plant Endpoints
 
 @app.post("/plants/", response_model=schemas.Plant)
-def create_plant(plant: schemas.PlantCreate, db: Session = Depends(get_db)):
+async def create_plant(plant: schemas.PlantCreate, db: AsyncSession = Depends(get_async_db)):
     # 1. Validate common_name uniqueness
-    existing_plant_by_common_name = db.execute(
+    existing_plant_by_common_name = (await db.execute(
         text("SELECT common_name FROM plants WHERE common_name = :common_name"),
         {"common_name": plant.common_name}
-    ).first()
+    )).first()
 
     if existing_plant_by_common_name:
         raise HTTPException(
@@ -152,10 +202,10 @@ def create_plant(plant: schemas.PlantCreate, db: Session = Depends(get_db)):
 
     # 2. Validate scientific_name uniqueness (if provided)
     if plant.scientific_name:
-        existing_plant_by_scientific_name = db.execute(
+        existing_plant_by_scientific_name = (await db.execute(
             text("SELECT scientific_name FROM plants WHERE scientific_name = :scientific_name"),
             {"scientific_name": plant.scientific_name}
-        ).first()
+        )).first()
 
         if existing_plant_by_scientific_name:
             raise HTTPException(
@@ -170,7 +220,7 @@ def create_plant(plant: schemas.PlantCreate, db: Session = Depends(get_db)):
         RETURNING plant_id, common_name, scientific_name, description, uses, region, plant_type, image_url, three_d_model_url;
     """)
     try:
-        result = db.execute(query, {
+        result = (await db.execute(query, {
             "common_name": plant.common_name,
             "scientific_name": plant.scientific_name,
             "description": plant.description,
@@ -179,137 +229,494 @@ def create_plant(plant: schemas.PlantCreate, db: Session = Depends(get_db)):
             "plant_type": plant.plant_type,
             "image_url": str(plant.image_url) if plant.image_url else None, # Convert HttpUrl to string
             "three_d_model_url": str(plant.three_d_model_url) if plant.three_d_model_url else None
-        }).first()
-        db.commit()
+        })).first()
+        await db.commit()
         if result:
+            invalidate_plants(result.plant_id) # New plant can show up on any cached list/search page
+            catalog_version.invalidate()
+            facets.schedule_refresh()
+            typeahead.add_plant(result.plant_id, result.common_name, result.scientific_name, result.uses)
             plant_data = result._asdict() # Convert the SQLAlchemy Row object to a dictionary for Pydantic
             return schemas.Plant(**plant_data) # Use the correct Pydantic model
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Plant could not be created")
+    except DBAPIError as e:
+        # A concurrent create of the same plant passes the checks above and trips the unique indexes
+        await db.rollback()
+        raise constraint_http_error(e) or HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
 
+@app.post("/plants/bulk")
+async def bulk_import_plants(
+    request: Request,
+    import_format: Optional[str] = Query(None, alias="format", description="ndjson or csv (default: from Content-Type)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Streams the request body through server/bulk_import.py in bounded chunks.
+    # The per-row report is spooled (memory up to 1 MB, then a temp file) and
+    # returned as NDJSON, followed by a final {"summary": {...}} line.
+    content_type = request.headers.get("content-type", "")
+    import_format = import_format or ("csv" if "csv" in content_type else "ndjson")
+    if import_format not in bulk_import.FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported format '{import_format}'. Use ndjson or csv.")
+
+    report = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+")
+
+    def write(entry):
+        report.write(json.dumps(entry) + "\n")
+
+    try:
+        summary = await bulk_import.import_plants(db, request.stream(), import_format, write)
+    except Exception as e:
+        report.close()
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Bulk import failed: {e}")
+    finally:
+        # Earlier chunks may have committed even if a later one failed
+        invalidate_plants()
+        catalog_version.invalidate()
+        facets.schedule_refresh()
+        typeahead.request_reload()
+
+    write({"summary": summary})
+    report.seek(0)
+
+    def stream_report():
+        with report:
+            yield from report
+
+    return StreamingResponse(stream_report(), media_type="application/x-ndjson")
+
+PLANT_COLUMNS_SQL = "p.plant_id, p.common_name, p.scientific_name, p.description, p.image_url, p.uses, p.region, p.plant_type, p.three_d_model_url"
+MAX_PLANT_IDS = int(os.getenv("MAX_PLANT_IDS", "500")) # Per ?ids= request
+
+def parse_plant_ids(raw_ids: List[str]) -> List[int]:
+    try:
+        plant_ids = [int(part) for raw in raw_ids for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be integers.")
+    if len(plant_ids) > MAX_PLANT_IDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_PLANT_IDS} ids per request.")
+    return plant_ids
+
+async def get_plants_by_ids(plant_ids: List[int], db: AsyncSession) -> List[dict]:
+    # Batch lookup: plants already in plant_cache are served from it, the rest come from
+    # one "= ANY(:ids)" query. Returned in the requested order; unknown ids are skipped.
+    plants = {}
+    missing_ids = []
+    for plant_id in dict.fromkeys(plant_ids):
+        cached_plant = plant_cache.get(plant_id)
+        if cached_plant is MISSING:
+            missing_ids.append(plant_id)
+        else:
+            plants[plant_id] = cached_plant
+
+    if missing_ids:
+        query = text(f"SELECT {PLANT_COLUMNS_SQL} FROM plants p WHERE p.plant_id = ANY(:ids);")
+        for row in (await db.execute(query, {"ids": missing_ids})).fetchall():
+            plant = plant_row_dict(row)
+            plant_cache.set(plant["plant_id"], plant)
+            plants[plant["plant_id"]] = plant
+
+    return [plants[plant_id] for plant_id in dict.fromkeys(plant_ids) if plant_id in plants]
+
 @app.get("/plants/", response_model=list[schemas.Plant])
-def get_all_plants(
+async def get_all_plants(
+    request: Request,
+    response: Response,
     # This now only takes one search_query parameter
     search_query: Optional[str] = Query(None, alias="q", description="Search by common name, scientific name, description, or uses"),
     skip: int = 0, # Pagination: number of records to skip
     limit: int = 100, # Pagination: maximum number of records to return
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    ids: Optional[List[str]] = Query(None, description="Fetch these plant ids instead of a page: ?ids=1,2,3 or ?ids=1&ids=2"),
+    region: Optional[str] = Query(None, description="Only plants from this region (exact match)"),
+    plant_type: Optional[str] = Query(None, description="Only plants of this type (exact match)"),
+    uses: Optional[List[str]] = Query(None, description="Only plants having ALL of these uses: ?uses=Medicinal&uses=Culinary"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query_str = "SELECT plant_id, common_name, scientific_name, description, image_url, uses, region, plant_type, three_d_model_url FROM plants WHERE 1=1"
+    # 304 for a client or CDN copy of the current catalog version (see server/http_cache.py)
+    not_modified = await conditional(request, response, db)
+    if not_modified is not None:
+        return not_modified
+
+    if ids:
+        return json_response(await get_plants_by_ids(parse_plant_ids(ids), db), response)
+
+    searching = bool(search_query and search_query.strip())
+    filters = facets.normalize_filters(region, plant_type, uses)
+
+    # Serve repeated pages (browse, popular searches) from the in-process cache
+    cache_key = (search_query.strip().lower() if searching else None, filters, None if after else skip, limit, after)
+    cached_page = plant_list_cache.get(cache_key)
+    if cached_page is not MISSING:
+        parsed_plants, next_cursor = cached_page
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return json_response(parsed_plants, response)
+
+    query_str = "SELECT plant_id, common_name, scientific_name, description, image_url, uses, region, plant_type, three_d_model_url"
     params = {}
 
-    if search_query:
-        # This is the crucial change: The single search_query now checks against
-        # common_name, scientific_name, description, AND uses.
-        # ARRAY_TO_STRING(uses, ' ') converts the PostgreSQL TEXT[] array into a
-        # space-separated string (e.g., "{Medicinal, Culinary}" becomes "Medicinal Culinary")
-        # allowing ILIKE to perform a fuzzy search within it.
-        query_str += """
-            AND (
-                common_name ILIKE :search OR
-                scientific_name ILIKE :search OR
-                description ILIKE :search OR
-                ARRAY_TO_STRING(uses, ' ') ILIKE :search
-            )
-        """
-        # The same search parameter applies to all fields for a unified search bar
-        params["search"] = f"%{search_query}%"
+    if searching:
+        # Indexed full-text + trigram search (see server/search.py and
+        # migrations/001_plant_search.sql). Matches common_name, scientific_name,
+        # uses and description, tolerates typos and partial names, and returns
+        # the most relevant plants first. The rank is selected so it can go into the cursor.
+        query_str += f", {search.SEARCH_RANK} AS search_rank FROM plants WHERE 1=1"
+        query_str += search.SEARCH_FILTER
+        params.update(search.search_params(search_query))
+    else:
+        query_str += " FROM plants WHERE 1=1"
+
+    # Structured filters (migrations/006_plant_facets.sql indexes)
+    filter_str, filter_params = facets.filter_sql(*filters)
+    query_str += filter_str
+    params.update(filter_params)
 
-    # Add pagination (OFFSET and LIMIT)
-    query_str += " OFFSET :skip LIMIT :limit;"
-    params["skip"] = skip
+    if after:
+        # Keyset pagination: seek past the last row of the previous page using the
+        # same key the page is ordered by, so page cost does not grow with depth.
+        if searching:
+            after_rank, after_plant_id = decode_cursor(after, (float, int))
+            query_str += f"""
+                AND ({search.SEARCH_RANK} < CAST(:after_rank AS DOUBLE PRECISION)
+                     OR ({search.SEARCH_RANK} = CAST(:after_rank AS DOUBLE PRECISION) AND plant_id > :after_plant_id))
+            """
+            params["after_rank"] = after_rank
+        else:
+            (after_plant_id,) = decode_cursor(after, (int,))
+            query_str += " AND plant_id > :after_plant_id"
+        params["after_plant_id"] = after_plant_id
+
+    # A stable ORDER BY keeps pages from shifting between requests
+    query_str += " ORDER BY search_rank DESC, plant_id" if searching else " ORDER BY plant_id"
+
+    # Add pagination (OFFSET and LIMIT). OFFSET is only used by skip/limit clients.
+    if not after:
+        query_str += " OFFSET :skip"
+        params["skip"] = skip
+    query_str += " LIMIT :limit;"
     params["limit"] = limit
 
     final_query = text(query_str)
-    result = db.execute(final_query, params).fetchall()
+    result = (await db.execute(final_query, params)).fetchall()
 
     if not result:
-        return []
+        plant_list_cache.set(cache_key, ([], None))
+        return json_response([], response)
 
-    # Map results to Pydantic schemas. 'uses' is already a List[str] from PostgreSQL.
-    parsed_plants = []
-    for row in result:
-        plant_dict = row._asdict()
-        parsed_plants.append(schemas.Plant(**plant_dict))
+    if searching:
+        set_next_cursor(response, result, limit, key=lambda row: (row.search_rank, row.plant_id))
+    else:
+        set_next_cursor(response, result, limit, key=lambda row: (row.plant_id,))
+
+    # Map rows to plain dicts in the schemas.Plant shape (see server/serialization.py).
+    # 'uses' is already a List[str] from PostgreSQL.
+    parsed_plants = [plant_row_dict(row) for row in result]
+
+    plant_list_cache.set(cache_key, (parsed_plants, response.headers.get(NEXT_CURSOR_HEADER)))
+    return json_response(parsed_plants, response)
+
+@app.get("/plants/facets", response_model=schemas.PlantFacets)
+async def get_plant_facets(
+    search_query: Optional[str] = Query(None, alias="q", description="Same search as GET /plants/"),
+    region: Optional[str] = Query(None),
+    plant_type: Optional[str] = Query(None),
+    uses: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Plant counts per region, plant type and use for the listing GET /plants/ would return
+    # with the same parameters. Without a search or filters the counts come from the
+    # plant_facets materialized view; otherwise only the matching plants are aggregated.
+    searching = bool(search_query and search_query.strip())
+    filters = facets.normalize_filters(region, plant_type, uses)
 
-    return parsed_plants
+    cache_key = (search_query.strip().lower() if searching else None, filters)
+    cached_facets = facet_cache.get(cache_key)
+    if cached_facets is not MISSING:
+        return json_response(cached_facets)
+
+    where_sql, params = facets.filter_sql(*filters)
+    if searching:
+        where_sql += search.SEARCH_FILTER
+        params.update(search.search_params(search_query))
+
+    plant_facets = await facets.read_facets(db, where_sql, params)
+    facet_cache.set(cache_key, plant_facets)
+    return json_response(plant_facets)
+
+TYPEAHEAD_MAX_LIMIT = 25
+
+@app.get("/plants/suggest", response_model=list[schemas.PlantSuggestion])
+async def suggest_plants(
+    q: str = Query(..., min_length=1, max_length=100, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=TYPEAHEAD_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Autocomplete for the search box: word-prefix matches on common name, scientific
+    # name and uses, accent- and case-insensitive (see server/typeahead.py).
+    index = typeahead.get_index()
+    if index is not None:
+        return json_response(index.suggest(q, limit))
+
+    # Index still loading: plain name-prefix match instead
+    query = text("""
+        SELECT plant_id, common_name, scientific_name FROM plants
+        WHERE common_name ILIKE :prefix OR scientific_name ILIKE :prefix
+        ORDER BY LENGTH(common_name), common_name LIMIT :limit;
+    """)
+    prefix = f"{search.escape_like(q.strip())}%"
+    result = (await db.execute(query, {"prefix": prefix, "limit": limit})).fetchall()
+    return json_response([row._asdict() for row in result])
+
+RECOMMENDATIONS_MAX_LIMIT = 50
+
+def get_recommendation_index():
+    index = recommendations.get_index()
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Recommendations are still loading. Retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    return index
+
+@app.get("/plants/popular", response_model=list[schemas.Plant])
+async def get_popular_plants(
+    limit: int = Query(10, ge=1, le=RECOMMENDATIONS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Most bookmarked plants, from the in-memory index (see server/recommendations.py)
+    plant_ids = get_recommendation_index().popular(limit)
+    return json_response(await get_plants_by_ids(plant_ids, db))
+
+@app.get("/plants/{plant_id}/related", response_model=list[schemas.Plant])
+async def get_related_plants(
+    plant_id: int,
+    limit: int = Query(10, ge=1, le=RECOMMENDATIONS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # "Users who bookmarked this also bookmarked": plants most often bookmarked
+    # together with plant_id, by cosine similarity of their bookmark counts.
+    # Ranking a popular plant scans thousands of neighbors, so the top ids are cached.
+    plant_ids = related_plants_cache.get(plant_id)
+    if plant_ids is MISSING:
+        plant_ids = get_recommendation_index().related(plant_id, RECOMMENDATIONS_MAX_LIMIT)
+        related_plants_cache.set(plant_id, plant_ids)
+    return json_response(await get_plants_by_ids(plant_ids[:limit], db))
 
 @app.get("/plants/{plant_id}", response_model=schemas.Plant)
-def read_plant(plant_id: int, db: Session = Depends(get_db)):
-    query = text("SELECT plant_id, common_name, scientific_name, description, uses, region, plant_type, image_url, three_d_model_url FROM plants WHERE plant_id = :plant_id;")
-    result = db.execute(query, {"plant_id": plant_id}).first()
-    if result is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plant not found")
-    return schemas.Plant(**result._asdict())
+async def read_plant(plant_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # Validators first: a new catalog version drops stale cached plants
+    not_modified = await conditional(request, response, db)
+
+    # The plant must exist before a 304 is sent (If-None-Match: * matches any ETag)
+    plant = plant_cache.get(plant_id)
+    if plant is MISSING:
+        query = text("SELECT plant_id, common_name, scientific_name, description, uses, region, plant_type, image_url, three_d_model_url FROM plants WHERE plant_id = :plant_id;")
+        result = (await db.execute(query, {"plant_id": plant_id})).first()
+        if result is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plant not found")
+        plant = plant_row_dict(result)
+        plant_cache.set(plant_id, plant)
+
+    if not_modified is not None:
+        return not_modified
+    return json_response(plant, response)
+
+
+@app.get("/stats/cache")
+def read_cache_stats():
+    # Hit/miss counters for the in-process plant catalog cache (per worker)
+    return cache_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Prometheus text exposition format (per worker process)
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled.")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/stats/facets")
+def read_facet_stats():
+    # Background refreshes of the plant_facets materialized view (per worker process)
+    return facets.refresher.stats()
+
+@app.get("/stats/recommendations")
+def read_recommendation_stats():
+    # Size of this worker's co-occurrence index and deltas awaiting compaction
+    index = recommendations.get_index()
+    return index.stats() if index is not None else {"loaded": False}
+
+@app.get("/stats/pool")
+def read_pool_stats():
+    # Connection pool sizing, checkout waits/timeouts, connections in use and overflow (per worker)
+    return pool_stats()
 
 
 ## Bookmark Endpoints
 
 @app.post("/bookmarks/", response_model=schemas.Bookmark)
-def create_bookmark(bookmark: schemas.BookmarkCreate, db: Session = Depends(get_db)):
-    # 1. Validate user_google_id existence
-    user_exists_query = text("SELECT 1 FROM users WHERE google_id = :google_id;")
-    user_exists = db.execute(user_exists_query, {"google_id": bookmark.user_google_id}).first()
-    if not user_exists:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
-
-    # 2. Validate plant_id existence
-    plant_exists_query = text("SELECT 1 FROM plants WHERE plant_id = :plant_id;")
-    plant_exists = db.execute(plant_exists_query, {"plant_id": bookmark.plant_id}).first()
-    if not plant_exists:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plant not found.")
-
-    # 3. Check for existing bookmark (to prevent duplicates)
-    existing_bookmark_query = text("SELECT bookmark_id FROM bookmarks WHERE user_google_id = :user_google_id AND plant_id = :plant_id;")
-    existing_bookmark = db.execute(existing_bookmark_query, {
-        "user_google_id": bookmark.user_google_id,
-        "plant_id": bookmark.plant_id
-    }).first()
-    if existing_bookmark:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="This plant is already bookmarked by this user.")
-
-    # Proceed with insertion if all validations pass
+async def create_bookmark(bookmark: schemas.BookmarkCreate, db: AsyncSession = Depends(get_async_db)):
+    # Single statement: the foreign keys report a missing user/plant (404) and the
+    # (user_google_id, plant_id) unique index turns a duplicate into "no row returned" (409).
     insert_query = text("""
         INSERT INTO bookmarks (user_google_id, plant_id)
         VALUES (:user_google_id, :plant_id)
+        ON CONFLICT (user_google_id, plant_id) DO NOTHING
         RETURNING bookmark_id, user_google_id, plant_id, bookmarked_at;
     """)
     try:
-        result = db.execute(insert_query, {
+        result = (await db.execute(insert_query, {
             "user_google_id": bookmark.user_google_id,
             "plant_id": bookmark.plant_id
-        }).first()
-        db.commit()
-        if result:
-            return schemas.Bookmark(**result._asdict())
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Bookmark could not be created.")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating bookmark: {e}")
+        })).first()
+        await db.commit()
+    except DBAPIError as e:
+        await db.rollback()
+        raise constraint_http_error(e) or HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating bookmark: {e}")
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="This plant is already bookmarked by this user.")
+    recommendations.bookmark_added(result.user_google_id, result.plant_id)
+    return schemas.Bookmark(**result._asdict())
 
 @app.get("/bookmarks/", response_model=list[schemas.Bookmark])
-def read_bookmarks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    query = text("SELECT bookmark_id, user_google_id, plant_id, bookmarked_at FROM bookmarks OFFSET :skip LIMIT :limit;")
-    result = db.execute(query, {"skip": skip, "limit": limit}).fetchall()
+async def read_bookmarks(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if after:
+        # Keyset pagination on (bookmarked_at, bookmark_id), served by bookmarks_bookmarked_at_id_idx
+        after_bookmarked_at, after_bookmark_id = decode_cursor(after, (datetime.fromisoformat, int))
+        query = text("""
+            SELECT bookmark_id, user_google_id, plant_id, bookmarked_at FROM bookmarks
+            WHERE (bookmarked_at, bookmark_id) > (:after_bookmarked_at, :after_bookmark_id)
+            ORDER BY bookmarked_at, bookmark_id LIMIT :limit;
+        """)
+        result = (await db.execute(query, {
+            "after_bookmarked_at": after_bookmarked_at,
+            "after_bookmark_id": after_bookmark_id,
+            "limit": limit
+        })).fetchall()
+    else:
+        query = text("SELECT bookmark_id, user_google_id, plant_id, bookmarked_at FROM bookmarks ORDER BY bookmarked_at, bookmark_id OFFSET :skip LIMIT :limit;")
+        result = (await db.execute(query, {"skip": skip, "limit": limit})).fetchall()
+    set_next_cursor(response, result, limit, key=lambda row: (row.bookmarked_at, row.bookmark_id))
     return [schemas.Bookmark(**row._asdict()) for row in result]
 
 @app.get("/bookmarks/user/{user_google_id}", response_model=list[schemas.Bookmark])
-def read_user_bookmarks(user_google_id: str, db: Session = Depends(get_db)):
+async def read_user_bookmarks(user_google_id: str, db: AsyncSession = Depends(get_async_db)):
     query = text("SELECT bookmark_id, user_google_id, plant_id, bookmarked_at FROM bookmarks WHERE user_google_id = :user_google_id;")
-    result = db.execute(query, {"user_google_id": user_google_id}).fetchall()
+    result = (await db.execute(query, {"user_google_id": user_google_id})).fetchall()
     if not result:
         return []
     return [schemas.Bookmark(**row._asdict()) for row in result]
 
+@app.get("/bookmarks/user/{user_google_id}/plants", response_model=list[schemas.BookmarkedPlant])
+async def read_user_bookmarked_plants(
+    user_google_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # A user's bookmarks joined with their plants, newest first, in one query.
+    # Keyset pagination on (bookmarked_at, bookmark_id) via bookmarks_user_bookmarked_at_id_idx.
+    query_str = f"""
+        SELECT b.bookmark_id, b.bookmarked_at, {PLANT_COLUMNS_SQL}
+        FROM bookmarks b JOIN plants p ON p.plant_id = b.plant_id
+        WHERE b.user_google_id = :user_google_id
+    """
+    params = {"user_google_id": user_google_id, "limit": limit}
+    if after:
+        params["after_bookmarked_at"], params["after_bookmark_id"] = decode_cursor(after, (datetime.fromisoformat, int))
+        query_str += " AND (b.bookmarked_at, b.bookmark_id) < (:after_bookmarked_at, :after_bookmark_id)"
+    query_str += " ORDER BY b.bookmarked_at DESC, b.bookmark_id DESC LIMIT :limit;"
+
+    result = (await db.execute(text(query_str), params)).fetchall()
+    set_next_cursor(response, result, limit, key=lambda row: (row.bookmarked_at, row.bookmark_id))
+
+    bookmarked_plants = [
+        {"bookmark_id": row.bookmark_id, "bookmarked_at": row.bookmarked_at, "plant": plant_row_dict(row)}
+        for row in result
+    ]
+    return json_response(bookmarked_plants, response)
+
+@app.post("/bookmarks/user/{user_google_id}/batch", response_model=schemas.BookmarkBatchResult)
+async def batch_sync_bookmarks(user_google_id: str, batch: schemas.BookmarkBatch, db: AsyncSession = Depends(get_async_db)):
+    # Applies a burst of offline bookmark changes in one transaction (at most two statements).
+    add_ids = sorted(set(batch.add))
+    remove_ids = sorted(set(batch.remove))
+    if set(add_ids) & set(remove_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A plant cannot be both added and removed in the same batch.")
+
+    added, already_bookmarked, plants_not_found, removed = [], [], [], []
+    try:
+        if add_ids:
+            # Insert the requested plants that exist and report, per plant id, whether
+            # it was inserted, already bookmarked, or does not exist.
+            add_query = text("""
+                WITH requested AS (
+                    SELECT UNNEST(CAST(:add_ids AS INTEGER[])) AS plant_id
+                ), inserted AS (
+                    INSERT INTO bookmarks (user_google_id, plant_id)
+                    SELECT :user_google_id, p.plant_id FROM plants p JOIN requested r ON r.plant_id = p.plant_id
+                    ON CONFLICT (user_google_id, plant_id) DO NOTHING
+                    RETURNING plant_id
+                )
+                SELECT r.plant_id, i.plant_id IS NOT NULL AS inserted, p.plant_id IS NOT NULL AS plant_exists
+                FROM requested r
+                LEFT JOIN inserted i ON i.plant_id = r.plant_id
+                LEFT JOIN plants p ON p.plant_id = r.plant_id
+                ORDER BY r.plant_id;
+            """)
+            for row in (await db.execute(add_query, {"user_google_id": user_google_id, "add_ids": add_ids})).fetchall():
+                if row.inserted:
+                    added.append(row.plant_id)
+                elif row.plant_exists:
+                    already_bookmarked.append(row.plant_id)
+                else:
+                    plants_not_found.append(row.plant_id)
+
+        if remove_ids:
+            remove_query = text("""
+                DELETE FROM bookmarks
+                WHERE user_google_id = :user_google_id AND plant_id = ANY(:remove_ids)
+                RETURNING plant_id;
+            """)
+            result = (await db.execute(remove_query, {"user_google_id": user_google_id, "remove_ids": remove_ids})).fetchall()
+            removed = sorted(row.plant_id for row in result)
+
+        await db.commit()
+    except DBAPIError as e:
+        await db.rollback()
+        raise constraint_http_error(e) or HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error syncing bookmarks: {e}")
+
+    for plant_id in added:
+        recommendations.bookmark_added(user_google_id, plant_id)
+    for plant_id in removed:
+        recommendations.bookmark_removed(user_google_id, plant_id)
+
+    return schemas.BookmarkBatchResult(
+        added=added,
+        removed=removed,
+        already_bookmarked=already_bookmarked,
+        plants_not_found=plants_not_found
+    )
+
 @app.delete("/bookmarks/{user_google_id}/{plant_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_bookmark(user_google_id: str, plant_id: int, db: Session = Depends(get_db)):
+async def delete_bookmark(user_google_id: str, plant_id: int, db: AsyncSession = Depends(get_async_db)):
     query = text("DELETE FROM bookmarks WHERE user_google_id = :user_google_id AND plant_id = :plant_id RETURNING bookmark_id;")
-    result = db.execute(query, {"user_google_id": user_google_id, "plant_id": plant_id}).first()
-    db.commit()
+    result = (await db.execute(query, {"user_google_id": user_google_id, "plant_id": plant_id})).first()
+    await db.commit()
     if result is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found for this user and plant")
+    recommendations.bookmark_removed(user_google_id, plant_id)
     return # No content returned for 204 status code
 
 ## AI Chat Endpoint
@@ -317,7 +724,7 @@ def delete_bookmark(user_google_id: str, plant_id: int, db: Session = Depends(ge
 async def list_gemini_models():
     available_models = []
     try:
-        for m in genai.list_models():
+        for m in ai_client.get_genai().list_models():
             # Filter for models that support text generation using generateContent
             if 'generateContent' in m.supported_generation_methods:
                 available_models.append({
@@ -329,96 +736,342 @@ async def list_gemini_models():
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error listing models: {e}")
 
 
+CHAT_MODEL_NAME = 'models/gemini-1.5-flash' # Keep using this model or one you verified
+
+# Define the system instruction
+CHAT_SYSTEM_INSTRUCTION = (
+    "You are a helpful assistant for a virtual herbal garden. "
+    "Provide information about plants, their uses, and general herbal remedies based on traditional knowledge. "
+    "Keep responses concise and informative."
+)
+
+def chat_contents(message: str) -> list:
+    # Combine the system instruction with the user's actual message
+    # The model will read this as one complete user input that sets context.
+    # (The system_instruction=... parameter is not recognized by this SDK version.)
+    full_prompt_for_ai = f"{CHAT_SYSTEM_INSTRUCTION}\n\nUser query: {message}"
+    return [{"role": "user", "parts": [full_prompt_for_ai]}]
+
 # CORRECTED: Changed endpoint path from "/chat/" to "/ai/chat" to match frontend
 @app.post("/ai/chat", response_model=schemas.ChatResponse)
 async def chat_with_ai(chat_request: schemas.ChatRequest):
-    try:
-        model = genai.GenerativeModel('models/gemini-1.5-flash') # Keep using this model or one you verified
-
-        # Define the system instruction
-        system_instruction_content = (
-            "You are a helpful assistant for a virtual herbal garden. "
-            "Provide information about plants, their uses, and general herbal remedies based on traditional knowledge. "
-            "Keep responses concise and informative."
+    async def generate():
+        # Shared model, concurrency limit, timeout and retries live in server/ai_client.py
+        response = await ai_client.generate_content(
+            CHAT_MODEL_NAME,
+            chat_contents(chat_request.message) # Pass the combined prompt here
         )
+        return response.text
 
-        # Combine the system instruction with the user's actual message
-        # The model will read this as one complete user input that sets context.
-        full_prompt_for_ai = f"{system_instruction_content}\n\nUser query: {chat_request.message}"
-
-        response = await model.generate_content_async(
-            contents=[{"role": "user", "parts": [full_prompt_for_ai]}] # Pass the combined prompt here
-            # Remove the system_instruction=... parameter as it's not recognized
-        )
-        ai_response = response.text
+    try:
+        # Repeated questions are answered from the cache, and identical concurrent
+        # questions wait on a single upstream call (see server/ai_cache.py).
+        cache_key = chat_cache_key(CHAT_MODEL_NAME, CHAT_SYSTEM_INSTRUCTION, chat_request.message)
+        ai_response = await chat_response_cache.get_or_compute(cache_key, generate)
         return {"response": ai_response}
+    except AIClientError as e:
+        raise ai_http_error(e)
     except Exception as e:
         print(f"Gemini API error: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"AI Chat error: {e}")
 
+def sse_event(event: str, data: dict) -> str:
+    # One Server-Sent Event; JSON keeps newlines in the text inside a single data: line
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ai/chat/stream")
+async def chat_with_ai_stream(chat_request: schemas.ChatRequest):
+    # Streaming variant of /ai/chat as Server-Sent Events:
+    #   event: chunk  data: {"text": "..."}   (repeated)
+    #   event: done   data: {}
+    #   event: error  data: {"detail": "..."}
+    # Chunks are pulled from Gemini only after the previous one has been sent, so a
+    # slow client applies backpressure all the way upstream. When the client
+    # disconnects, Starlette cancels this generator and the upstream call is cancelled.
+    cache_key = chat_cache_key(CHAT_MODEL_NAME, CHAT_SYSTEM_INSTRUCTION, chat_request.message)
+    cached_answer = chat_response_cache.cache.get(cache_key) # Looked up once so a miss is counted once
+    if cached_answer is MISSING:
+        try:
+            ai_client.check_available() # Report overload as 429/503 before the stream starts
+        except AIClientError as e:
+            raise ai_http_error(e)
+
+    async def event_stream(cached_answer):
+        if cached_answer is not MISSING:
+            yield sse_event("chunk", {"text": cached_answer})
+            yield sse_event("done", {})
+            return
+
+        chat_response_cache.upstream_calls += 1
+        parts = []
+        stream = ai_client.stream_content(CHAT_MODEL_NAME, chat_contents(chat_request.message))
+        try:
+            async for chunk in stream:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield sse_event("chunk", {"text": chunk.text})
+        except AIClientError as e:
+            yield sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            logger.exception("Gemini API streaming error")
+            yield sse_event("error", {"detail": f"AI Chat error: {e}"})
+            return
+        finally:
+            await stream.aclose() # Cancels the upstream call if we stopped early
+
+        # Complete answers also serve later non-streaming requests
+        chat_response_cache.cache.set(cache_key, "".join(parts))
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        event_stream(cached_answer),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Keep nginx from buffering the stream
+    )
+
+@app.get("/stats/ai")
+async def read_ai_stats():
+    # Chat cache hit rate, upstream Gemini calls saved, limiter/breaker state (per worker)
+    return {"chat": chat_response_cache.stats(), "client": ai_client_stats()}
+
+IDENTIFY_MODEL_NAME = 'models/gemini-1.5-flash'
+
+# Define the prompt for the AI.
+IDENTIFY_PROMPT = (
+    "Analyze this image and identify the plant. "
+    "Then, provide a brief description of the plant and its common traditional/medicinal usages. "
+    "Format your response strictly as follows: "
+    "Plant Name: [Name]\nDescription: [Description]\nUsage: [Usage]\n"
+    "If you cannot identify it, state 'Unknown Plant'."
+)
+
+# By name, so the SDK's enums are not needed at import (the SDK accepts either)
+IDENTIFY_SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
+
+def parse_identification(ai_response_text: str) -> schemas.PlantIdentificationResponse:
+    plant_name = "Unknown Plant"
+    description = "Could not identify the plant or its description."
+    usage = "No usage information available."
+    confidence = None
+
+    for line in ai_response_text.split('\n'):
+        if line.startswith("Plant Name:"):
+            plant_name = line.replace("Plant Name:", "").strip()
+        elif line.startswith("Description:"):
+            description = line.replace("Description:", "").strip()
+        elif line.startswith("Usage:"):
+            usage = line.replace("Usage:", "").strip()
+
+    if "unknown plant" in plant_name.lower():
+        description = "The AI could not identify this plant from the image."
+        usage = "No specific usage information available."
+
+    return schemas.PlantIdentificationResponse(
+        plant_name=plant_name,
+        description=description,
+        usage=usage,
+        confidence=confidence
+    )
+
+async def identify_image_bytes(image_bytes: bytes) -> schemas.PlantIdentificationResponse:
+    # Preprocess (process pool), answer repeat photos from the perceptual-hash cache,
+    # otherwise ask Gemini with the downscaled JPEG.
+    try:
+        jpeg_bytes, phash = await prepare_image(image_bytes)
+    except ImageRejected as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    cached_result = identification_cache.get(phash)
+    if cached_result is not MISSING:
+        return cached_result
+
+    # Shared multimodal Gemini model behind the limiter/timeout/retry layer
+    response = await ai_client.generate_content(
+        IDENTIFY_MODEL_NAME,
+        [IDENTIFY_PROMPT, {"mime_type": "image/jpeg", "data": jpeg_bytes}],
+        safety_settings=IDENTIFY_SAFETY_SETTINGS
+    )
+    result = parse_identification(response.text)
+
+    # Only cache real identifications so an "Unknown Plant" photo can be retried
+    if "unknown plant" not in result.plant_name.lower():
+        identification_cache.set(phash, result)
+    return result
+
 # google lens
 @app.post("/identify-plant/", response_model=schemas.PlantIdentificationResponse)
 async def identify_plant(image: UploadFile = File(...)):
-    if not image.content_type.startswith("image/"):
+    if not (image.content_type or "").startswith("image/"):
         raise HTTPException(status_code=400, detail="Uploaded file is not an image.")
 
-    try:
-        # Read image content as bytes
-        image_bytes = await image.read()
-
-        # Load image using PIL (Pillow)
-        img = Image.open(io.BytesIO(image_bytes))
-
-        # Initialize the multimodal Gemini model
-        model = genai.GenerativeModel('models/gemini-1.5-flash')
-
-        # Define the prompt for the AI.
-        prompt = [
-            "Analyze this image and identify the plant. "
-            "Then, provide a brief description of the plant and its common traditional/medicinal usages. "
-            "Format your response strictly as follows: "
-            "Plant Name: [Name]\nDescription: [Description]\nUsage: [Usage]\n"
-            "If you cannot identify it, state 'Unknown Plant'.",
-            img
-        ]
-
-        response = await model.generate_content_async(
-            prompt,
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-            }
-        )
-
-        ai_response_text = response.text
-
-        plant_name = "Unknown Plant"
-        description = "Could not identify the plant or its description."
-        usage = "No usage information available."
-        confidence = None
-
-        for line in ai_response_text.split('\n'):
-            if line.startswith("Plant Name:"):
-                plant_name = line.replace("Plant Name:", "").strip()
-            elif line.startswith("Description:"):
-                description = line.replace("Description:", "").strip()
-            elif line.startswith("Usage:"):
-                usage = line.replace("Usage:", "").strip()
-
-        if "unknown plant" in plant_name.lower():
-            description = "The AI could not identify this plant from the image."
-            usage = "No specific usage information available."
-
-        return schemas.PlantIdentificationResponse(
-            plant_name=plant_name,
-            description=description,
-            usage=usage,
-            confidence=confidence
-        )
+    # Read image content as bytes, capped at IDENTIFY_MAX_UPLOAD_BYTES
+    image_bytes = await read_upload_limited(image)
 
+    try:
+        return await identify_image_bytes(image_bytes)
+    except HTTPException:
+        raise
+    except AIClientError as e:
+        raise ai_http_error(e)
     except Exception as e:
         print(f"Error in plant identification: {e}")
         # Explicitly convert the exception to a string for the detail message
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to identify plant: {str(e)}") #
+
+IDENTIFY_BATCH_CONCURRENCY = int(os.getenv("IDENTIFY_BATCH_CONCURRENCY", "4")) # Per batch; ai_client still caps the total
+
+@app.post("/identify-plant/batch")
+async def identify_plant_batch(images: List[UploadFile] = File(...)):
+    # One NDJSON line per image, written as soon as that image is done (so in completion
+    # order, not upload order):
+    #   {"index": 0, "filename": "...", "status_code": 200, "result": {...PlantIdentificationResponse}}
+    #   {"index": 1, "filename": "...", "status_code": 400, "detail": "..."}
+    # A failed image does not fail the batch.
+    if len(images) > IDENTIFY_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {IDENTIFY_BATCH_MAX_IMAGES} images per batch.")
+
+    # Uploads are read up front: they are closed once this handler returns the response
+    uploads = []
+    for index, image in enumerate(images):
+        try:
+            if not (image.content_type or "").startswith("image/"):
+                raise HTTPException(status_code=400, detail="Uploaded file is not an image.")
+            uploads.append((index, image.filename, await read_upload_limited(image)))
+        except HTTPException as e:
+            uploads.append((index, image.filename, e))
+
+    semaphore = asyncio.Semaphore(IDENTIFY_BATCH_CONCURRENCY)
+
+    async def identify_one(index, filename, image_bytes):
+        line = {"index": index, "filename": filename}
+        try:
+            if isinstance(image_bytes, HTTPException):
+                raise image_bytes
+            async with semaphore:
+                result = await identify_image_bytes(image_bytes)
+            line.update(status_code=status.HTTP_200_OK, result=result.model_dump())
+        except (HTTPException, AIClientError) as e:
+            line.update(status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            logger.exception("Error in plant identification")
+            line.update(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to identify plant: {str(e)}")
+        return line
+
+    async def stream_results():
+        tasks = [asyncio.ensure_future(identify_one(*upload)) for upload in uploads]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Client went away: stop the images still waiting or in flight
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+async def run_identify_job(image_bytes: bytes) -> dict:
+    return (await identify_image_bytes(image_bytes)).model_dump()
+
+# Submit/poll mode: the upload is queued and answered with a job id right away, so a
+# slow Gemini call holds a queue slot instead of a front-end connection
+identify_jobs = JobManager(
+    InProcessJobBackend(JOB_MAX_QUEUE, JOB_MAX_QUEUED_BYTES, JOB_RESULT_TTL_SECONDS),
+    run_identify_job,
+    JOB_WORKERS,
+)
+
+@app.post("/identify-plant/jobs", response_model=schemas.IdentificationJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_identify_job(response: Response, image: UploadFile = File(...)):
+    if not (image.content_type or "").startswith("image/"):
+        raise HTTPException(status_code=400, detail="Uploaded file is not an image.")
+
+    image_bytes = await read_upload_limited(image)
+    try:
+        job = await identify_jobs.submit(image_bytes)
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Identification queue is full, please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    response.headers["Location"] = f"/identify-plant/jobs/{job.job_id}"
+    return job.to_dict()
+
+@app.get("/identify-plant/jobs/{job_id}", response_model=schemas.IdentificationJob)
+async def get_identify_job(job_id: str):
+    job = await identify_jobs.backend.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired.")
+    return job.to_dict()
+
+@app.get("/identify-plant/jobs/{job_id}/events")
+async def stream_identify_job(job_id: str):
+    # SSE alternative to polling: a "status" event on every state change, ending with
+    # "result" or "error". Comment lines keep idle connections alive through proxies.
+    job = await identify_jobs.backend.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired.")
+
+    async def event_stream():
+        last_status = None
+        current = job
+        while True:
+            if current is None:
+                yield sse_event("error", {"detail": "Job expired."})
+                return
+            if current.status != last_status:
+                last_status = current.status
+                yield sse_event("status", {"job_id": job_id, "status": current.status})
+            if current.status in FINISHED_STATES:
+                if current.error is not None:
+                    yield sse_event("error", {"detail": current.error})
+                else:
+                    yield sse_event("result", current.result)
+                return
+            current = await identify_jobs.backend.wait(job_id, timeout=15)
+            if current is not None and current.status == last_status:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/stats/jobs")
+async def read_job_stats():
+    # Queue depth, busy workers, failures and queue-wait/run-time percentiles (per worker process)
+    return identify_jobs.stats()
+
+@app.on_event("startup")
+async def start_identify_workers():
+    identify_jobs.start()
+
+@app.on_event("startup")
+async def start_typeahead_loader():
+    # Loads in the background; startup and /livez do not wait for the database
+    typeahead.start()
+
+@app.on_event("startup")
+async def start_recommendation_index():
+    # Background load, periodic compaction and reload
+    recommendations.start()
+
+@app.get("/stats/images")
+async def read_image_stats():
+    # Bytes saved by downscaling, preprocessing time and identification cache hit rate (per worker)
+    return imaging_stats()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await identify_jobs.stop()
+    await facets.refresher.stop()
+    await typeahead.stop()
+    await recommendations.stop()
+    shutdown_pool()
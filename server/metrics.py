@@ -0,0 +1,189 @@
+# server/metrics.py
+# In-process metrics exported in Prometheus text format on GET /metrics.
+#
+#   http_requests_total / http_request_duration_seconds   per route template (ASGI middleware)
+#   db_query_duration_seconds / db_query_errors_total      per normalized SQL statement
+#   ai_request_duration_seconds                            per Gemini model, operation and outcome
+#   image_preprocess_duration_seconds                      image decode/resize in the process pool
+#
+# With METRICS_ENABLED=false the middleware and SQL hooks are not installed and the
+# timing helpers return immediately, so the cost is one flag check per call.
+# Values are per worker process; Prometheus sums across workers and pods.
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {} # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le_label)} {cumulative}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}"
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency, until the response body is sent.", ("method", "route"))
+db_latency = Histogram("db_query_duration_seconds", "SQL statement execution time.", ("engine", "statement"), DB_BUCKETS)
+db_errors = Counter("db_query_errors_total", "SQL statements that raised an error.", ("engine", "statement"))
+ai_latency = Histogram("ai_request_duration_seconds", "Gemini calls including limiter wait and retries.", ("model", "operation", "outcome"))
+image_latency = Histogram("image_preprocess_duration_seconds", "Image decode, resize and re-encode in the process pool.", ("outcome",))
+
+REGISTRY = (http_requests, http_latency, db_latency, db_errors, ai_latency, image_latency)
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels):
+    # Observes the block's duration with `labels` plus an outcome label, "ok" or "error"
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        histogram.observe(time.perf_counter() - start, *labels, "error")
+        raise
+    histogram.observe(time.perf_counter() - start, *labels, "ok")
+
+
+class MetricsMiddleware:
+    # Pure ASGI middleware (no per-request task or body buffering, streaming-safe).
+    # Requests are labelled with the matched route template (e.g. /plants/{plant_id}),
+    # which Starlette's router stores in scope["route"], so label cardinality stays bounded.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route_path, str(status_code))
+            http_latency.observe(time.perf_counter() - start, method, route_path)
+
+
+_STATEMENT_TABLE = re.compile(r"\b(?:from|into|update|join)\s+([a-z_][a-z0-9_.]*)", re.IGNORECASE)
+_statement_names = {} # SQL text -> normalized name; statements come from a fixed set of queries
+
+
+def statement_name(statement: str) -> str:
+    # "SELECT plants", "INSERT bookmarks", "WITH bookmarks", ... : verb + first table
+    name = _statement_names.get(statement)
+    if name is None:
+        words = statement.split(None, 1)
+        verb = words[0].upper() if words else "?"
+        table = _STATEMENT_TABLE.search(statement)
+        name = f"{verb} {table.group(1).lower()}" if table else verb
+        if len(_statement_names) < 1000:
+            _statement_names[statement] = name
+    return name
+
+
+def instrument_engine(engine, name: str):
+    # SQL timing hooks on a sync Engine (for async engines, pass .sync_engine)
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["metrics_query_start"].pop()
+        db_latency.observe(time.perf_counter() - start, name, statement_name(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        db_errors.inc(name, statement_name(context.statement or ""))
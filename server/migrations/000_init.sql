@@ -0,0 +1,31 @@
+-- server/migrations/000_init.sql
+-- Base schema for a fresh database (local development, benchmarks). Matches the
+-- tables the API expects; apply 001-005 after it.
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/000_init.sql
+-- Safe to re-run: existing tables are left alone.
+
+CREATE TABLE IF NOT EXISTS users (
+    google_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    first_name TEXT,
+    last_name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS plants (
+    plant_id SERIAL PRIMARY KEY,
+    common_name TEXT NOT NULL,
+    scientific_name TEXT,
+    description TEXT,
+    uses TEXT[],
+    region TEXT,
+    plant_type TEXT,
+    image_url TEXT,
+    three_d_model_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS bookmarks (
+    bookmark_id SERIAL PRIMARY KEY,
+    user_google_id TEXT NOT NULL REFERENCES users (google_id),
+    plant_id INTEGER NOT NULL REFERENCES plants (plant_id),
+    bookmarked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,38 @@
+-- server/migrations/001_plant_search.sql
+-- Full-text + trigram search for the plants table.
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/001_plant_search.sql
+-- Safe to re-run: every statement is idempotent.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE plants ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+-- Weighted document: common name (A) > scientific name (B) > uses (C) > description (D).
+-- A trigger is used instead of a generated column because ARRAY_TO_STRING is not IMMUTABLE.
+CREATE OR REPLACE FUNCTION plants_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.common_name, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(NEW.scientific_name, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(ARRAY_TO_STRING(NEW.uses, ' '), '')), 'C') ||
+        setweight(to_tsvector('english', COALESCE(NEW.description, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS plants_search_vector_trigger ON plants;
+CREATE TRIGGER plants_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF common_name, scientific_name, uses, description
+    ON plants
+    FOR EACH ROW EXECUTE FUNCTION plants_search_vector_update();
+
+-- Backfill rows that existed before the trigger (the no-op UPDATE fires it).
+UPDATE plants SET common_name = common_name WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS plants_search_vector_idx ON plants USING GIN (search_vector);
+
+-- Trigram indexes serve typo-tolerant (%) matches and ILIKE '%partial%' on names.
+CREATE INDEX IF NOT EXISTS plants_common_name_trgm_idx ON plants USING GIN (common_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS plants_scientific_name_trgm_idx ON plants USING GIN (scientific_name gin_trgm_ops);
+
+ANALYZE plants;
@@ -0,0 +1,6 @@
+-- server/migrations/002_keyset_pagination.sql
+-- Index backing keyset pagination of GET /bookmarks/ on (bookmarked_at, bookmark_id).
+-- /plants/ and /users/ seek on their primary keys and need no extra index.
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/002_keyset_pagination.sql
+
+CREATE INDEX IF NOT EXISTS bookmarks_bookmarked_at_id_idx ON bookmarks (bookmarked_at, bookmark_id);
@@ -0,0 +1,8 @@
+-- server/migrations/003_plant_unique_names.sql
+-- Unique indexes behind INSERT ... ON CONFLICT DO NOTHING in server/bulk_import.py.
+-- They also serve the name lookups in create_plant. NULL scientific names never conflict.
+-- Fails if duplicate names already exist; resolve those first.
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/003_plant_unique_names.sql
+
+CREATE UNIQUE INDEX IF NOT EXISTS plants_common_name_key ON plants (common_name);
+CREATE UNIQUE INDEX IF NOT EXISTS plants_scientific_name_key ON plants (scientific_name);
@@ -0,0 +1,9 @@
+-- server/migrations/004_bookmark_upsert.sql
+-- Unique index behind ON CONFLICT (user_google_id, plant_id) in create_bookmark and
+-- the batch bookmark sync. It also serves the per-user bookmark lookups.
+-- Fails if duplicate bookmarks already exist; remove them first, e.g.:
+--   DELETE FROM bookmarks a USING bookmarks b
+--   WHERE a.user_google_id = b.user_google_id AND a.plant_id = b.plant_id AND a.bookmark_id > b.bookmark_id;
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/004_bookmark_upsert.sql
+
+CREATE UNIQUE INDEX IF NOT EXISTS bookmarks_user_plant_key ON bookmarks (user_google_id, plant_id);
@@ -0,0 +1,7 @@
+-- server/migrations/005_user_bookmark_pages.sql
+-- Index backing GET /bookmarks/user/{user_google_id}/plants: one user's bookmarks,
+-- newest first, keyset-paginated on (bookmarked_at, bookmark_id).
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/005_user_bookmark_pages.sql
+
+CREATE INDEX IF NOT EXISTS bookmarks_user_bookmarked_at_id_idx
+    ON bookmarks (user_google_id, bookmarked_at DESC, bookmark_id DESC);
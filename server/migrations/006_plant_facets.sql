@@ -0,0 +1,28 @@
+-- server/migrations/006_plant_facets.sql
+-- Structured filters on GET /plants/ and precomputed facet counts for GET /plants/facets.
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/006_plant_facets.sql
+-- Safe to re-run: every statement is idempotent.
+
+-- ?region= and ?plant_type= are equality filters; plant_id is included so a filtered
+-- page can be read in keyset order straight from the index.
+CREATE INDEX IF NOT EXISTS plants_region_plant_id_idx ON plants (region, plant_id);
+CREATE INDEX IF NOT EXISTS plants_plant_type_plant_id_idx ON plants (plant_type, plant_id);
+
+-- ?uses= is an array containment filter (uses @> ARRAY[...]).
+CREATE INDEX IF NOT EXISTS plants_uses_idx ON plants USING GIN (uses);
+
+-- Catalog-wide counts per region, plant type and use, plus the total ('total', '').
+-- Refreshed by the API after plant writes (server/facets.py) and by the bulk import CLI.
+-- The unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY, which
+-- does not block readers.
+CREATE MATERIALIZED VIEW IF NOT EXISTS plant_facets AS
+    SELECT 'total' AS facet, '' AS value, COUNT(*) AS plant_count FROM plants
+    UNION ALL
+    SELECT 'region', region, COUNT(*) FROM plants WHERE region IS NOT NULL GROUP BY region
+    UNION ALL
+    SELECT 'plant_type', plant_type, COUNT(*) FROM plants WHERE plant_type IS NOT NULL GROUP BY plant_type
+    UNION ALL
+    SELECT 'uses', use_name, COUNT(DISTINCT plant_id) FROM plants, UNNEST(uses) AS use_name
+        WHERE use_name IS NOT NULL GROUP BY use_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS plant_facets_facet_value_key ON plant_facets (facet, value);
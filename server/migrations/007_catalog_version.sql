@@ -0,0 +1,27 @@
+-- server/migrations/007_catalog_version.sql
+-- Catalog version behind the ETag / Last-Modified headers of the plant read endpoints
+-- (server/http_cache.py). Every statement that changes plants bumps the single row,
+-- so all workers and pods derive the same validators from one cheap primary-key read.
+-- Apply with: psql "$DATABASE_URL" -f server/migrations/007_catalog_version.sql
+-- Safe to re-run: every statement is idempotent.
+
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), -- Exactly one row
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO catalog_version (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+-- Statement-level, so a multi-row bulk INSERT bumps the version once, not per row.
+CREATE OR REPLACE FUNCTION catalog_version_bump() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = clock_timestamp();
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS plants_catalog_version_trigger ON plants;
+CREATE TRIGGER plants_catalog_version_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON plants
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump();
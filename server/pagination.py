@@ -0,0 +1,46 @@
+# server/pagination.py
+# Opaque cursors for keyset ("seek") pagination.
+#
+# A cursor is the ordered sort key of the last row on a page, JSON-encoded and
+# base64url'd so clients treat it as an opaque token. List endpoints return it in
+# the X-Next-Cursor response header (the JSON body stays a plain list, so old
+# skip/limit clients are unaffected) and accept it back as ?after=<token>.
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=_json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: tuple) -> list:
+    # Decodes a cursor into its key values, converting each one with the matching
+    # callable in `types` (e.g. (float, int)). Tokens that were not produced by
+    # encode_cursor for the same sort key are rejected with 400.
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor has the wrong shape")
+        return [convert(value) for convert, value in zip(types, values)]
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, key) -> None:
+    # Only a full page can have a next page; `key` maps the last row to its sort key.
+    if rows and len(rows) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
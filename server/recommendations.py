@@ -0,0 +1,285 @@
+# server/recommendations.py
+# Popular plants and "also bookmarked" recommendations from an in-memory
+# co-occurrence index over the bookmarks table (GET /plants/popular and
+# GET /plants/{plant_id}/related).
+#
+# For every plant the index keeps how many users bookmarked it and, as a sparse
+# vector, how many users bookmarked it together with each other plant. Compacted
+# vectors are two sorted integer arrays (neighbor plant ids, counts); bookmark
+# writes go into a small per-plant delta dict, which compact() folds into the
+# arrays every RECOMMENDATIONS_COMPACT_SECONDS. A bookmark write costs O(bookmarks
+# of that user). Users with more than CO_OCCURRENCE_MAX_USER_BOOKMARKS bookmarks
+# count towards popularity but not co-occurrence (bulk or bot accounts would
+# otherwise add a quadratic number of pairs).
+#
+# Related plants are ranked by cosine similarity: co-count / sqrt(count_a * count_b).
+# The index is loaded in the background at startup and reloaded every
+# RECOMMENDATIONS_RELOAD_SECONDS so bookmarks written through other workers or pods
+# are picked up; this worker's writes are applied immediately.
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from sqlalchemy import text
+
+from .database import async_session
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_RELOAD_SECONDS = float(os.getenv("RECOMMENDATIONS_RELOAD_SECONDS", "900"))
+RECOMMENDATIONS_COMPACT_SECONDS = float(os.getenv("RECOMMENDATIONS_COMPACT_SECONDS", "60"))
+RECOMMENDATIONS_RETRY_SECONDS = 10 # After a failed load
+CO_OCCURRENCE_MAX_USER_BOOKMARKS = int(os.getenv("CO_OCCURRENCE_MAX_USER_BOOKMARKS", "500"))
+POPULAR_REFRESH_SECONDS = 5 # The popular ranking is recomputed at most this often
+
+LOAD_QUERY = text("SELECT user_google_id, plant_id FROM bookmarks ORDER BY user_google_id;")
+
+
+class CoOccurrenceIndex:
+    def __init__(self, max_user_bookmarks: int = CO_OCCURRENCE_MAX_USER_BOOKMARKS):
+        self.max_user_bookmarks = max_user_bookmarks
+        self._user_plants = {} # user_google_id -> sorted array("i") of plant ids
+        self._popularity = {} # plant_id -> number of users who bookmarked it
+        self._neighbors = {} # plant_id -> (array("i") neighbor ids, sorted; array("I") co-counts)
+        self._delta = {} # plant_id -> {neighbor_id: co-count change since the last compaction}
+        self._popular = None # (computed_at, size, [plant_id, ...] most bookmarked first)
+
+    @classmethod
+    def build(cls, rows, max_user_bookmarks: int = CO_OCCURRENCE_MAX_USER_BOOKMARKS):
+        # rows: (user_google_id, plant_id), grouped by user
+        index = cls(max_user_bookmarks)
+        grouped = {}
+        for user_google_id, plant_id in rows:
+            grouped.setdefault(user_google_id, set()).add(plant_id)
+
+        co_counts = {} # plant_id -> Counter({neighbor_id: co-count})
+        popularity = Counter()
+        for user_google_id, plant_ids in grouped.items():
+            user_plants = sorted(plant_ids)
+            index._user_plants[user_google_id] = array("i", user_plants)
+            popularity.update(user_plants)
+            if len(user_plants) > max_user_bookmarks:
+                continue
+            for plant_id in user_plants:
+                counts = co_counts.get(plant_id)
+                if counts is None:
+                    counts = co_counts[plant_id] = Counter()
+                counts.update(user_plants) # Counted in C; the plant itself is removed below
+
+        index._popularity = dict(popularity)
+        for plant_id, counts in co_counts.items():
+            del counts[plant_id]
+            if counts:
+                index._neighbors[plant_id] = index._pack(counts)
+        return index
+
+    @staticmethod
+    def _pack(counts: dict):
+        # {neighbor_id: co-count > 0} -> (sorted neighbor ids, co-counts)
+        neighbor_ids = sorted(counts)
+        return array("i", neighbor_ids), array("I", map(counts.__getitem__, neighbor_ids))
+
+    def _contributes(self, bookmark_count: int) -> bool:
+        return bookmark_count <= self.max_user_bookmarks
+
+    def _add_pairs(self, plant_id, others, change: int):
+        # Co-count change between plant_id and each of `others`, both directions
+        delta = self._delta.setdefault(plant_id, {})
+        for other_id in others:
+            if other_id == plant_id:
+                continue
+            delta[other_id] = delta.get(other_id, 0) + change
+            other_delta = self._delta.setdefault(other_id, {})
+            other_delta[plant_id] = other_delta.get(plant_id, 0) + change
+
+    def _add_all_pairs(self, plant_ids, change: int):
+        for position, plant_id in enumerate(plant_ids):
+            self._add_pairs(plant_id, plant_ids[position + 1:], change)
+
+    def add(self, user_google_id: str, plant_id: int):
+        user_plants = self._user_plants.get(user_google_id)
+        if user_plants is None:
+            user_plants = self._user_plants[user_google_id] = array("i")
+        position = bisect_left(user_plants, plant_id)
+        if position < len(user_plants) and user_plants[position] == plant_id:
+            return
+        before = len(user_plants)
+        if self._contributes(before + 1):
+            self._add_pairs(plant_id, user_plants, 1)
+        elif self._contributes(before):
+            self._add_all_pairs(user_plants, -1) # Crossed the cap: withdraw this user's pairs
+        user_plants.insert(position, plant_id)
+        self._popularity[plant_id] = self._popularity.get(plant_id, 0) + 1
+
+    def remove(self, user_google_id: str, plant_id: int):
+        user_plants = self._user_plants.get(user_google_id)
+        if user_plants is None:
+            return
+        position = bisect_left(user_plants, plant_id)
+        if position == len(user_plants) or user_plants[position] != plant_id:
+            return
+        del user_plants[position]
+        after = len(user_plants)
+        if self._contributes(after + 1):
+            self._add_pairs(plant_id, user_plants, -1)
+        elif self._contributes(after):
+            self._add_all_pairs(user_plants, 1) # Back under the cap
+        if not user_plants:
+            del self._user_plants[user_google_id]
+        self._popularity[plant_id] -= 1
+        if not self._popularity[plant_id]:
+            del self._popularity[plant_id]
+
+    def compact_plant(self, plant_id):
+        delta = self._delta.pop(plant_id, None)
+        if not delta:
+            return
+        neighbor_ids, co_counts = self._neighbors.get(plant_id, ((), ()))
+        counts = dict(zip(neighbor_ids, co_counts))
+        for neighbor_id, change in delta.items():
+            count = counts.get(neighbor_id, 0) + change
+            if count > 0:
+                counts[neighbor_id] = count
+            else:
+                counts.pop(neighbor_id, None)
+        if counts:
+            self._neighbors[plant_id] = self._pack(counts)
+        else:
+            self._neighbors.pop(plant_id, None)
+
+    def dirty_plants(self) -> list:
+        return list(self._delta)
+
+    def related(self, plant_id: int, limit: int) -> list:
+        # Plant ids most often bookmarked together with plant_id, best first
+        neighbor_ids, co_counts = self._neighbors.get(plant_id, ((), ()))
+        delta = self._delta.get(plant_id)
+        if delta:
+            counts = dict(zip(neighbor_ids, co_counts))
+            for neighbor_id, change in delta.items():
+                counts[neighbor_id] = counts.get(neighbor_id, 0) + change
+            pairs = counts.items()
+        else:
+            pairs = zip(neighbor_ids, co_counts)
+
+        popularity = self._popularity
+        plant_count = popularity.get(plant_id, 0)
+        if not plant_count:
+            return []
+        scored = (
+            (count / math.sqrt(plant_count * popularity[neighbor_id]), count, -neighbor_id)
+            for neighbor_id, count in pairs
+            if count > 0 and popularity.get(neighbor_id)
+        )
+        return [-negated_id for _, _, negated_id in heapq.nlargest(limit, scored)]
+
+    def popular(self, limit: int) -> list:
+        now = time.monotonic()
+        if self._popular is None or now - self._popular[0] >= POPULAR_REFRESH_SECONDS or self._popular[1] < limit:
+            size = max(limit, 100)
+            ranked = heapq.nlargest(size, self._popularity.items(), key=lambda item: (item[1], -item[0]))
+            self._popular = (now, size, [plant_id for plant_id, _ in ranked])
+        return self._popular[2][:limit]
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._user_plants),
+            "plants": len(self._popularity),
+            "bookmarks": sum(self._popularity.values()),
+            "co_occurrence_entries": sum(len(neighbor_ids) for neighbor_ids, _ in self._neighbors.values()),
+            "pending_delta_entries": sum(len(delta) for delta in self._delta.values()),
+        }
+
+
+_index = None # CoOccurrenceIndex once loaded
+_pending_changes = [] # Bookmark writes during a load, replayed onto the new index
+_loading = False
+_task = None
+
+
+def get_index():
+    return _index
+
+
+def bookmark_added(user_google_id: str, plant_id: int):
+    if _loading:
+        _pending_changes.append((True, user_google_id, plant_id))
+    if _index is not None:
+        _index.add(user_google_id, plant_id)
+
+
+def bookmark_removed(user_google_id: str, plant_id: int):
+    if _loading:
+        _pending_changes.append((False, user_google_id, plant_id))
+    if _index is not None:
+        _index.remove(user_google_id, plant_id)
+
+
+async def load():
+    global _index, _loading
+    _loading = True
+    try:
+        async with async_session() as db:
+            rows = (await db.execute(LOAD_QUERY)).fetchall()
+        # Building counts every pair; keep it off the event loop
+        index = await asyncio.get_running_loop().run_in_executor(
+            None, CoOccurrenceIndex.build, [tuple(row) for row in rows]
+        )
+        for added, user_google_id, plant_id in _pending_changes:
+            if added:
+                index.add(user_google_id, plant_id)
+            else:
+                index.remove(user_google_id, plant_id)
+        _index = index
+    finally:
+        _pending_changes.clear()
+        _loading = False
+
+
+async def compact(batch_size: int = 50):
+    # Folds pending deltas into the arrays, yielding to the event loop between batches
+    index = _index
+    if index is None:
+        return
+    for position, plant_id in enumerate(index.dirty_plants()):
+        index.compact_plant(plant_id)
+        if position % batch_size == batch_size - 1:
+            await asyncio.sleep(0)
+
+
+async def _maintenance_loop():
+    next_load = 0.0 # time.monotonic() of the next full reload
+    while True:
+        if time.monotonic() >= next_load:
+            try:
+                await load()
+                next_load = time.monotonic() + RECOMMENDATIONS_RELOAD_SECONDS
+            except Exception:
+                logger.exception("Recommendation index load failed")
+                next_load = time.monotonic() + RECOMMENDATIONS_RETRY_SECONDS
+        else:
+            await compact()
+        await asyncio.sleep(max(min(RECOMMENDATIONS_COMPACT_SECONDS, next_load - time.monotonic()), 0))
+
+
+def start():
+    global _task
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(_maintenance_loop())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -40,6 +40,21 @@ class Plant(PlantBase):
     class Config:
         from_attributes = True # Allows Pydantic to read from attributes (e.g., from query results)
 
+class PlantSuggestion(BaseModel):
+    plant_id: int
+    common_name: str
+    scientific_name: Optional[str] = None
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class PlantFacets(BaseModel):
+    total: int # Plants matching the query
+    region: List[FacetCount]
+    plant_type: List[FacetCount]
+    uses: List[FacetCount]
+
 class BookmarkCreate(BaseModel):
     user_google_id: str
     plant_id: int
@@ -51,6 +66,22 @@ class Bookmark(BookmarkCreate):
     class Config:
         from_attributes = True
 
+class BookmarkedPlant(BaseModel):
+    # A bookmark with its plant, so a bookmark list renders without one request per plant
+    bookmark_id: int
+    bookmarked_at: datetime
+    plant: Plant
+
+class BookmarkBatch(BaseModel):
+    add: List[int] = [] # plant_ids to bookmark
+    remove: List[int] = [] # plant_ids to un-bookmark
+
+class BookmarkBatchResult(BaseModel):
+    added: List[int]
+    removed: List[int]
+    already_bookmarked: List[int]
+    plants_not_found: List[int]
+
 class ChatRequest(BaseModel):
     message: str
 
@@ -61,4 +92,14 @@ class PlantIdentificationResponse(BaseModel):
     plant_name: str
     description: str
     usage: str
-    confidence: Optional[float] = None 
\ No newline at end of file
+    confidence: Optional[float] = None
+
+
+class IdentificationJob(BaseModel):
+    job_id: str
+    status: str # queued, running, succeeded or failed
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[PlantIdentificationResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,42 @@
+# server/search.py
+# SQL building blocks for plant search.
+# Relies on the search_vector column, trigger and indexes from migrations/001_plant_search.sql.
+
+# websearch_to_tsquery accepts free text from the search box ("holy basil", "fever -cough")
+# without raising syntax errors the way to_tsquery would.
+TSQUERY = "websearch_to_tsquery('english', :search_text)"
+
+# Every branch of this filter is served by a GIN index:
+#   - search_vector @@ ...           -> plants_search_vector_idx
+#   - name % :search_text (typos)    -> plants_*_trgm_idx
+#   - name ILIKE '%partial%'         -> plants_*_trgm_idx
+SEARCH_FILTER = f"""
+    AND (
+        search_vector @@ {TSQUERY} OR
+        common_name % :search_text OR
+        scientific_name % :search_text OR
+        common_name ILIKE :search_like OR
+        scientific_name ILIKE :search_like
+    )
+"""
+
+# Relevance: weighted full-text rank plus the best trigram similarity on either name,
+# so a close misspelling of a common name still ranks above a description-only hit.
+# Cast to DOUBLE PRECISION so the value round-trips exactly through pagination cursors.
+SEARCH_RANK = f"""CAST(
+    ts_rank_cd(search_vector, {TSQUERY}) +
+    GREATEST(similarity(common_name, :search_text), similarity(COALESCE(scientific_name, ''), :search_text))
+AS DOUBLE PRECISION)"""
+
+
+def escape_like(value: str) -> str:
+    # Treat user input literally inside ILIKE patterns
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_params(search_query: str) -> dict:
+    search_query = search_query.strip()
+    return {
+        "search_text": search_query,
+        "search_like": f"%{escape_like(search_query)}%",
+    }
@@ -0,0 +1,61 @@
+# server/serialization.py
+# Fast path from DB rows to JSON response bytes for the read-heavy catalog endpoints.
+#
+# Read endpoints build plain dicts from rows (keys in the response model's field
+# order) instead of Pydantic models. With JSON_FAST_PATH on (the default) they are
+# encoded straight to bytes with orjson, skipping FastAPI's response_model
+# validation; with it off, FastAPI validates and serializes them as before (once,
+# instead of once when building the model and again for response_model).
+# The JSON is the same either way: URLs are stored already normalized by the
+# write paths (str(HttpUrl)), and datetimes use Pydantic's ISO format.
+import json
+import os
+from datetime import datetime
+
+from fastapi import Response
+
+from . import schemas
+
+try:
+    import orjson
+except ImportError: # Optional: fall back to the stdlib encoder
+    orjson = None
+
+JSON_FAST_PATH = os.getenv("JSON_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+# Response field order of schemas.Plant (PlantBase fields, then plant_id)
+PLANT_FIELDS = tuple(schemas.Plant.model_fields)
+
+
+def plant_row_dict(row) -> dict:
+    # Row (or row mapping) -> dict with exactly the fields of schemas.Plant
+    mapping = row._mapping if hasattr(row, "_mapping") else row
+    return {field: mapping[field] for field in PLANT_FIELDS}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat().replace("+00:00", "Z") # Same as Pydantic for UTC datetimes
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    # Same settings as Starlette's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def json_response(content, response: Response = None):
+    # Returns `content` for FastAPI to validate against response_model, or, on the fast
+    # path, a Response with the encoded bytes. Headers set on the endpoint's injected
+    # `response` (e.g. X-Next-Cursor) are copied, since FastAPI ignores them when an
+    # endpoint returns its own Response.
+    if not JSON_FAST_PATH:
+        return content
+    fast_response = Response(content=dumps(content), media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                fast_response.headers.append(name, value)
+    return fast_response
@@ -0,0 +1,109 @@
+# server/tests/conftest.py
+# Shared fixtures. Tests run without Gemini or network access: `fake_gemini`
+# installs a scriptable stand-in model through ai_client.set_model_factory().
+#
+#   python -m pytest server/tests
+import asyncio
+
+import httpx
+import pytest
+
+from server import ai_client, main
+from server.cache import SingleFlightCache
+
+
+class FakeCall:
+    # Stands in for api_core's wrapped gRPC streaming call: cancel() on the call,
+    # and a plain async generator (no cancel()) to iterate it, like the real one
+    def __init__(self, chunks, fail_after=None, chunk_delay=0.0):
+        self.chunks = list(chunks)
+        self.fail_after = fail_after # Raise after this many chunks
+        self.chunk_delay = chunk_delay
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    async def _wrapped_aiter(self):
+        for position, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and position == self.fail_after:
+                raise ValueError("fake upstream failure")
+            await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+
+class FakeResponse:
+    # Shaped like the SDK's AsyncGenerateContentResponse: _iterator is aiter(call)
+    def __init__(self, text: str, call: FakeCall = None):
+        self.text = text
+        self.call = call
+        self._iterator = call._wrapped_aiter() if call is not None else None
+
+    @property
+    def iterator_closed(self) -> bool:
+        return self._iterator.ag_frame is None # Finished or closed
+
+    async def __aiter__(self):
+        async for chunk in self._iterator:
+            yield FakeResponse(chunk)
+
+
+class FakeGemini:
+    # Factory passed to set_model_factory(); records every upstream call
+    def __init__(self):
+        self.answer = "Tulsi is used for coughs and colds."
+        self.chunks = ["Tulsi ", "is used ", "for coughs."]
+        self.delay = 0.0 # Before the answer (or the stream) starts
+        self.chunk_delay = 0.0
+        self.fail_after = None
+        self.calls = []
+        self.streams = [] # FakeResponse of every streaming call
+
+    def __call__(self, model_name: str, **kwargs):
+        return FakeModel(self, model_name)
+
+
+class FakeModel:
+    def __init__(self, fake: FakeGemini, model_name: str):
+        self.fake = fake
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.fake.calls.append(contents)
+        await asyncio.sleep(self.fake.delay)
+        if not stream:
+            return FakeResponse(self.fake.answer)
+        call = FakeCall(self.fake.chunks, self.fake.fail_after, self.fake.chunk_delay)
+        response = FakeResponse("".join(self.fake.chunks), call)
+        self.fake.streams.append(response)
+        return response
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_gemini():
+    fake = FakeGemini()
+    ai_client.set_model_factory(fake)
+    ai_client.breaker.record_success()
+    yield fake
+    ai_client.set_model_factory(None)
+
+
+@pytest.fixture
+def chat_cache(monkeypatch):
+    # A fresh chat answer cache per test (tests may shrink maxsize/ttl)
+    cache = SingleFlightCache("ai_chat", maxsize=100, ttl=3600)
+    monkeypatch.setattr(main, "chat_response_cache", cache)
+    return cache
+
+
+@pytest.fixture
+async def client():
+    # In-process ASGI client; lifespan (startup hooks) is not run
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        yield async_client
@@ -0,0 +1,110 @@
+# server/tests/test_ai_cache.py
+# /ai/chat answer cache and request coalescing (server/cache.py, server/ai_cache.py).
+import asyncio
+
+import pytest
+
+from server.cache import SingleFlightCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def ask(client, message: str) -> str:
+    response = await client.post("/ai/chat", json={"message": message})
+    assert response.status_code == 200
+    return response.json()["response"]
+
+
+async def test_repeated_question_is_served_from_cache(client, fake_gemini, chat_cache):
+    assert await ask(client, "Uses of Tulsi?") == fake_gemini.answer
+    assert await ask(client, "  uses of tulsi ") == fake_gemini.answer # Same normalized prompt
+
+    assert len(fake_gemini.calls) == 1
+    stats = chat_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["upstream_calls"]) == (1, 1, 1)
+
+
+async def test_expired_answer_is_fetched_again(client, fake_gemini, monkeypatch):
+    cache = SingleFlightCache("ai_chat", maxsize=100, ttl=0.05)
+    monkeypatch.setattr("server.main.chat_response_cache", cache)
+
+    await ask(client, "uses of neem")
+    await asyncio.sleep(0.1)
+    await ask(client, "uses of neem")
+
+    assert len(fake_gemini.calls) == 2
+    assert cache.stats()["hits"] == 0
+
+
+async def test_least_recently_used_answer_is_evicted(client, fake_gemini, monkeypatch):
+    cache = SingleFlightCache("ai_chat", maxsize=2, ttl=3600)
+    monkeypatch.setattr("server.main.chat_response_cache", cache)
+
+    await ask(client, "uses of neem")
+    await ask(client, "uses of mint")
+    await ask(client, "uses of neem") # Hit: mint is now the least recently used
+    await ask(client, "uses of aloe") # Evicts mint
+    assert len(fake_gemini.calls) == 3
+
+    await ask(client, "uses of neem")
+    assert len(fake_gemini.calls) == 3
+    await ask(client, "uses of mint")
+    assert len(fake_gemini.calls) == 4
+    assert cache.stats()["evictions"] == 2
+
+
+async def test_concurrent_identical_questions_share_one_upstream_call(client, fake_gemini, chat_cache):
+    fake_gemini.delay = 0.1
+    answers = await asyncio.gather(*(ask(client, "uses of ginger") for _ in range(10)))
+
+    assert answers == [fake_gemini.answer] * 10
+    assert len(fake_gemini.calls) == 1
+    stats = chat_cache.stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced"] == 9
+    assert (stats["hits"], stats["misses"]) == (9, 1) # Followers count as hits
+    assert stats["hit_rate"] == 0.9
+    assert stats["upstream_calls_saved"] == 9
+
+
+async def test_failed_call_is_not_cached(chat_cache):
+    async def failing():
+        raise RuntimeError("upstream broke")
+
+    with pytest.raises(RuntimeError):
+        await chat_cache.get_or_compute("key", failing)
+    assert "key" not in chat_cache.cache._data
+
+
+async def test_followers_take_over_when_the_leader_is_cancelled(chat_cache):
+    calls = []
+
+    async def slow_answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    leader = asyncio.create_task(chat_cache.get_or_compute("key", slow_answer))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.create_task(chat_cache.get_or_compute("key", slow_answer)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel() # Its client disconnected
+
+    assert await asyncio.gather(*followers) == ["answer"] * 3
+    assert leader.cancelled()
+    assert len(calls) == 2 # One follower became the new leader, the others coalesced onto it
+
+
+async def test_cancelled_follower_does_not_cancel_the_shared_call(chat_cache):
+    async def slow_answer():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    leader = asyncio.create_task(chat_cache.get_or_compute("key", slow_answer))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(chat_cache.get_or_compute("key", slow_answer))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+
+    assert await leader == "answer"
+    assert follower.cancelled()
@@ -0,0 +1,71 @@
+# server/tests/test_ai_stream.py
+# /ai/chat/stream Server-Sent Events: framing, errors, cancellation and caching.
+import json
+
+import pytest
+
+from server import main, schemas
+
+pytestmark = pytest.mark.anyio
+
+
+def parse_events(body: str) -> list:
+    # "event: x\ndata: {...}\n\n" frames -> [(event, data), ...]
+    events = []
+    for frame in body.split("\n\n"):
+        if not frame:
+            continue
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+async def stream_chat(client, message: str) -> list:
+    response = await client.post("/ai/chat/stream", json={"message": message})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.endswith("\n\n")
+    return parse_events(response.text)
+
+
+async def test_chunks_are_framed_as_events_and_cached(client, fake_gemini, chat_cache):
+    events = await stream_chat(client, "uses of tulsi")
+
+    assert events == [("chunk", {"text": chunk}) for chunk in fake_gemini.chunks] + [("done", {})]
+    assert not fake_gemini.streams[0].call.cancelled # Completed streams are left alone
+    stats = chat_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["upstream_calls"]) == (0, 1, 1)
+
+    # The complete answer now serves both endpoints without another upstream call
+    assert await stream_chat(client, "Uses of Tulsi") == [("chunk", {"text": "".join(fake_gemini.chunks)}), ("done", {})]
+    response = await client.post("/ai/chat", json={"message": "uses of tulsi"})
+    assert response.json() == {"response": "".join(fake_gemini.chunks)}
+    assert len(fake_gemini.calls) == 1
+    stats = chat_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["upstream_calls"]) == (2, 1, 1)
+
+
+async def test_upstream_failure_ends_with_error_event(client, fake_gemini, chat_cache):
+    fake_gemini.fail_after = 1
+
+    events = await stream_chat(client, "uses of neem")
+
+    assert events == [("chunk", {"text": fake_gemini.chunks[0]}), ("error", {"detail": "AI Chat error: fake upstream failure"})]
+    assert fake_gemini.streams[0].iterator_closed
+    assert len(chat_cache.cache.keys()) == 0 # Partial answers are not cached
+
+
+async def test_client_disconnect_cancels_upstream(fake_gemini, chat_cache):
+    fake_gemini.chunk_delay = 0.01
+    response = await main.chat_with_ai_stream(schemas.ChatRequest(message="uses of mint"))
+    body = response.body_iterator
+
+    first = await body.__anext__()
+    assert parse_events(first) == [("chunk", {"text": fake_gemini.chunks[0]})]
+    await body.aclose() # What Starlette does when the client goes away
+
+    stream = fake_gemini.streams[0]
+    assert stream.call.cancelled
+    assert stream.iterator_closed
+    assert len(chat_cache.cache.keys()) == 0
@@ -0,0 +1,78 @@
+# server/tests/test_bulk_import.py
+# NDJSON/CSV row parsing of the streaming bulk import (server/bulk_import.py).
+import time
+
+import pytest
+
+from server import bulk_import
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunks_of(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def rows(iterator) -> list:
+    return [row async for row in iterator]
+
+
+async def test_csv_quoted_fields_may_span_lines_and_chunks():
+    data = 'common_name,description,uses\r\nTulsi,"Holy ""basil""\nof India",Medicinal;Culinary\r\n\r\nNeem,,\n'.encode()
+
+    parsed = await rows(bulk_import._iter_csv(chunks_of("﻿".encode() + data)))
+
+    assert parsed == [
+        (1, {"common_name": "Tulsi", "description": 'Holy "basil"\nof India', "uses": ["Medicinal", "Culinary"]}),
+        (2, {"common_name": "Neem", "description": None, "uses": None}),
+    ]
+
+
+async def test_csv_stray_quote_is_bounded_and_parsing_resumes():
+    lines = ["common_name,description", 'Aloe,"unterminated'] + [f"Plant {n},Line {n}" for n in range(40000)]
+    data = ("\n".join(lines) + "\n").encode()
+
+    start = time.perf_counter()
+    parsed = await rows(bulk_import._iter_csv(chunks_of(data, 64 * 1024), max_row_bytes=1000))
+    elapsed = time.perf_counter() - start
+
+    assert parsed[0] == (1, "Row exceeds the 1000 byte limit.")
+    assert parsed[-1] == (len(parsed), {"common_name": "Plant 39999", "description": "Line 39999"})
+    assert len(parsed) > 39900
+    assert elapsed < 2 # Linear: every line is scanned once
+
+
+async def test_csv_unterminated_quote_at_the_end():
+    parsed = await rows(bulk_import._iter_csv(chunks_of(b'common_name\nTulsi\n"Neem\nleaf')))
+    assert parsed == [(1, {"common_name": "Tulsi"}), (2, "Unterminated quoted field.")]
+
+
+async def test_ndjson_long_line_is_reported_and_skipped():
+    data = b'{"common_name": "Tulsi"}\n\n' + b'{"common_name": "' + b"x" * 5000 + b'"}\n[1]\n{"common_name": "Neem"}'
+
+    parsed = await rows(bulk_import._iter_ndjson(chunks_of(data, 100), max_row_bytes=1000))
+
+    assert parsed == [
+        (1, {"common_name": "Tulsi"}),
+        (2, "Row exceeds the 1000 byte limit."),
+        (3, "Each line must be a JSON object."),
+        (4, {"common_name": "Neem"}),
+    ]
+
+
+async def test_ndjson_body_without_newlines_is_not_buffered():
+    async def endless_line():
+        for _ in range(2000):
+            yield b"x" * 4096
+
+    start = time.perf_counter()
+    parsed = await rows(bulk_import._iter_ndjson(endless_line(), max_row_bytes=1000))
+
+    assert parsed == [(1, "Row exceeds the 1000 byte limit.")]
+    assert time.perf_counter() - start < 2
+
+
+async def test_utf8_split_across_chunks():
+    data = '{"common_name": "Tulsí"}\n'.encode()
+    assert await rows(bulk_import._iter_ndjson(chunks_of(data, 1))) == [(1, {"common_name": "Tulsí"})]
@@ -0,0 +1,78 @@
+# server/tests/test_http_cache.py
+# Conditional GET /plants/{plant_id} (server/http_cache.py) with a stand-in database session.
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from server import cache, http_cache, main
+from server.database import get_async_db
+
+pytestmark = pytest.mark.anyio
+
+TULSI = {
+    "plant_id": 1, "common_name": "Tulsi", "scientific_name": "Ocimum tenuiflorum", "description": "Holy basil.",
+    "uses": ["Medicinal"], "region": "India", "plant_type": "Herb", "image_url": None, "three_d_model_url": None,
+}
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    # Answers the catalog version query and single-plant lookups from `plants`
+    def __init__(self, plants: dict):
+        self.plants = plants
+        self.plant_queries = 0
+
+    async def execute(self, query, params=None):
+        if query is http_cache.VERSION_QUERY:
+            return FakeResult(SimpleNamespace(version=7, updated_at=datetime(2025, 6, 1, tzinfo=timezone.utc)))
+        self.plant_queries += 1
+        plant = self.plants.get(params["plant_id"])
+        return FakeResult(SimpleNamespace(_mapping=plant) if plant else None)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    session = FakeSession({1: TULSI})
+    monkeypatch.setattr(http_cache, "catalog_version", http_cache.CatalogVersion(60))
+    monkeypatch.setattr(main, "plant_cache", cache.TTLCache("plants", 100, 60))
+    main.app.dependency_overrides[get_async_db] = lambda: session
+    yield session
+    main.app.dependency_overrides.pop(get_async_db, None)
+
+
+async def test_plant_carries_validators_and_revalidates_to_304(client, db):
+    response = await client.get("/plants/1")
+    assert response.status_code == 200
+    assert response.json() == TULSI
+    assert response.headers["etag"] == 'W/"catalog-7"'
+    assert response.headers["last-modified"] == "Sun, 01 Jun 2025 00:00:00 GMT"
+
+    revalidated = await client.get("/plants/1", headers={"if-none-match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == 'W/"catalog-7"'
+    assert db.plant_queries == 1 # The existence check was a plant cache hit
+
+    stale = await client.get("/plants/1", headers={"if-none-match": 'W/"catalog-6"'})
+    assert stale.status_code == 200
+
+
+@pytest.mark.parametrize("headers", [
+    {"if-none-match": "*"},
+    {"if-none-match": 'W/"catalog-7"'},
+    {"if-modified-since": "Mon, 02 Jun 2025 00:00:00 GMT"},
+])
+async def test_missing_plant_is_404_even_when_validators_match(client, db, headers):
+    response = await client.get("/plants/2", headers=headers)
+    assert response.status_code == 404
+
+
+async def test_star_matches_an_existing_plant(client, db):
+    assert (await client.get("/plants/1", headers={"if-none-match": "*"})).status_code == 304
@@ -0,0 +1,134 @@
+# server/tests/test_jobs.py
+# Submit/poll/SSE identification jobs (server/jobs.py) against the in-process backend
+# and a minimal stand-in backend, with a fake Gemini model.
+import asyncio
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from server import imaging, main
+from server.jobs import FINISHED_STATES, QUEUED, RUNNING, FAILED, SUCCEEDED, InProcessJobBackend, Job, JobBackend, JobManager, QueueFull
+
+pytestmark = pytest.mark.anyio
+
+IDENTIFY_ANSWER = "Plant Name: Tulsi\nDescription: Holy basil.\nUsage: Coughs and colds."
+
+
+class PollingJobBackend(JobBackend):
+    # Stand-in for an external queue: plain storage, no change notifications, so
+    # waiting falls back to JobBackend.wait() polling like a remote store would
+    def __init__(self, max_queue: int = 10):
+        self.max_queue = max_queue
+        self.jobs = {}
+        self.queue = asyncio.Queue()
+
+    async def submit(self, payload: bytes) -> Job:
+        if self.queue.qsize() >= self.max_queue:
+            raise QueueFull()
+        job = Job(f"job-{len(self.jobs)}")
+        self.jobs[job.job_id] = job
+        self.queue.put_nowait((job.job_id, payload))
+        return job
+
+    async def next_job(self):
+        job_id, payload = await self.queue.get()
+        job = self.jobs[job_id]
+        job.status = RUNNING
+        job.started_at = job.created_at
+        return job, payload
+
+    async def finish(self, job_id: str, result: dict = None, error: str = None) -> None:
+        job = self.jobs[job_id]
+        job.status = FAILED if error is not None else SUCCEEDED
+        job.result = result
+        job.error = error
+        job.finished_at = job.started_at
+
+    async def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+
+def leaf_jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (64, 48), (40, 140, 60)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+@pytest.fixture(params=["in_process", "polling"])
+async def identify_jobs(request, monkeypatch, fake_gemini):
+    fake_gemini.answer = IDENTIFY_ANSWER
+    fake_gemini.delay = 0.05 # Long enough for the client to see the job before it finishes
+    monkeypatch.setattr(imaging, "identification_cache", imaging.PerceptualHashCache(100, 3600, 0))
+    monkeypatch.setattr(main, "identification_cache", imaging.identification_cache)
+
+    backend = InProcessJobBackend(10, 1024 * 1024, 60) if request.param == "in_process" else PollingJobBackend()
+    manager = JobManager(backend, main.run_identify_job, workers=1)
+    monkeypatch.setattr(main, "identify_jobs", manager)
+    manager.start()
+    yield manager
+    await manager.stop()
+    imaging.shutdown_pool()
+
+
+def parse_events(body: str) -> list:
+    events = []
+    for frame in body.split("\n\n"):
+        lines = [line for line in frame.split("\n") if line and not line.startswith(":")]
+        if lines:
+            event_line, data_line = lines
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+async def submit(client, data: bytes, content_type: str = "image/jpeg"):
+    return await client.post("/identify-plant/jobs", files={"image": ("leaf.jpg", data, content_type)})
+
+
+async def test_submit_poll_and_stream_to_completion(client, identify_jobs):
+    response = await submit(client, leaf_jpeg())
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == QUEUED
+    assert response.headers["location"] == f"/identify-plant/jobs/{job['job_id']}"
+
+    polled = (await client.get(response.headers["location"])).json()
+    assert polled["job_id"] == job["job_id"] and polled["status"] in (QUEUED, RUNNING)
+
+    stream = await client.get(f"/identify-plant/jobs/{job['job_id']}/events")
+    events = parse_events(stream.text)
+    statuses = [data["status"] for event, data in events if event == "status"]
+    assert statuses[-1] == SUCCEEDED and set(statuses) <= {QUEUED, RUNNING, SUCCEEDED}
+    assert events[-1] == ("result", {"plant_name": "Tulsi", "description": "Holy basil.", "usage": "Coughs and colds.", "confidence": None})
+
+    polled = (await client.get(response.headers["location"])).json()
+    assert polled["status"] in FINISHED_STATES and polled["result"]["plant_name"] == "Tulsi"
+    assert identify_jobs.stats()["succeeded"] == 1
+
+
+async def test_failed_job_ends_stream_with_error(client, identify_jobs):
+    response = await submit(client, b"not an image")
+    job_id = response.json()["job_id"]
+
+    events = parse_events((await client.get(f"/identify-plant/jobs/{job_id}/events")).text)
+
+    assert events[-2] == ("status", {"job_id": job_id, "status": FAILED})
+    assert events[-1][0] == "error" and events[-1][1]["detail"].startswith("Could not decode image")
+    assert identify_jobs.stats()["failed"] == 1
+
+
+async def test_upload_without_content_type_is_rejected(client, identify_jobs):
+    body = b'--b\r\nContent-Disposition: form-data; name="image"; filename="leaf"\r\n\r\nxyz\r\n--b--\r\n'
+    response = await client.post("/identify-plant/jobs", content=body, headers={"content-type": "multipart/form-data; boundary=b"})
+
+    assert response.status_code == 400
+    assert identify_jobs.stats()["submitted"] == 0
+
+
+async def test_unknown_job_is_404(client, identify_jobs):
+    assert (await client.get("/identify-plant/jobs/nope")).status_code == 404
+    assert (await client.get("/identify-plant/jobs/nope/events")).status_code == 404
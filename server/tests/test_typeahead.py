@@ -0,0 +1,49 @@
+# server/tests/test_typeahead.py
+# Prefix index ranking (server/typeahead.py).
+from server import typeahead
+from server.typeahead import SCAN_LIMIT, PrefixIndex
+
+
+def names(suggestions: list) -> list:
+    return [suggestion["common_name"] for suggestion in suggestions]
+
+
+def crowded_rows():
+    # Many use keys sort before "tulsi" and share its prefix
+    rows = [(plant_id, f"Herb {plant_id}", None, [f"Tula remedy {plant_id}"]) for plant_id in range(1, 2 * SCAN_LIMIT)]
+    rows.append((1000, "Tulsi", "Ocimum tenuiflorum", ["Medicinal"]))
+    return rows
+
+
+def test_name_match_is_not_crowded_out_by_earlier_keys():
+    index = PrefixIndex.build(crowded_rows())
+
+    suggestions = index.suggest("tul", 5)
+
+    assert suggestions[0] == {"plant_id": 1000, "common_name": "Tulsi", "scientific_name": "Ocimum tenuiflorum"}
+    assert len(suggestions) == 5
+
+
+def test_added_plant_is_ranked_with_the_built_ones():
+    index = PrefixIndex.build(crowded_rows())
+    index.add(1001, "Tulip Tree", None, [])
+
+    assert names(index.suggest("TUL", 3)) == ["Tulsi", "Tulip Tree", "Herb 1"]
+    assert names(index.suggest("tree", 3)) == ["Tulip Tree"]
+
+
+def test_ranking_by_match_kind_then_name_length():
+    index = PrefixIndex.build([
+        (1, "Holy Basil", "Ocimum tenuiflorum", ["Basil tea"]),
+        (2, "Basil", "Ocimum basilicum", ["Culinary"]),
+        (3, "Thai Basil Plant", "Ocimum basilicum thyrsiflora", []),
+        (4, "Lemon", "Citrus limon", ["Basil substitute"]),
+    ])
+
+    assert names(index.suggest("basil", 10)) == ["Basil", "Holy Basil", "Thai Basil Plant", "Lemon"]
+    assert names(index.suggest("ócimum", 2)) == ["Basil", "Holy Basil"]
+    assert index.suggest("   ", 5) == []
+
+
+def test_fold():
+    assert typeahead.fold("Tulsí  (Holy-Basil)") == "tulsi holy basil"
@@ -0,0 +1,78 @@
+# server/tests/test_upload_limits.py
+# Image upload size caps: whole request body (UploadLimitMiddleware) and per file.
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from server import imaging
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = "test-boundary"
+MULTIPART_HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+def multipart_body(image_size: int) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="image"; filename="leaf.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + b"\xff" * image_size + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def small_body_limit(monkeypatch):
+    monkeypatch.setitem(imaging.UPLOAD_BODY_LIMITS, "/identify-plant/", 1000)
+    monkeypatch.setitem(imaging.UPLOAD_BODY_LIMITS, "/identify-plant/jobs", 1000)
+
+
+@pytest.mark.parametrize("path", ["/identify-plant/", "/identify-plant/jobs"])
+async def test_declared_oversized_body_is_rejected_before_it_is_read(client, fake_gemini, small_body_limit, path):
+    chunks_read = 0
+
+    async def body():
+        nonlocal chunks_read
+        for _ in range(10):
+            chunks_read += 1
+            yield b"\xff" * 500
+
+    response = await client.post(path, content=body(), headers={**MULTIPART_HEADERS, "content-length": "5000"})
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds the 1000 byte limit."}
+    assert chunks_read == 0
+    assert fake_gemini.calls == []
+
+
+async def test_streamed_oversized_body_is_cut_off_once_over_the_limit(client, fake_gemini, small_body_limit):
+    data = multipart_body(5000)
+    chunks_read = 0
+
+    async def body():
+        # No Content-Length: sent with chunked transfer encoding
+        nonlocal chunks_read
+        for start in range(0, len(data), 500):
+            chunks_read += 1
+            yield data[start:start + 500]
+
+    response = await client.post("/identify-plant/", content=body(), headers=MULTIPART_HEADERS)
+
+    assert response.status_code == 413
+    assert chunks_read == 3 # Stopped at the first chunk past 1000 bytes
+    assert fake_gemini.calls == []
+
+
+async def test_other_routes_are_not_limited(client, fake_gemini, chat_cache, small_body_limit):
+    response = await client.post("/ai/chat", json={"message": "uses of tulsi " * 200})
+    assert response.status_code == 200
+
+
+async def test_each_file_is_still_capped():
+    upload = UploadFile(io.BytesIO(b"\xff" * 2000), filename="leaf.jpg")
+
+    assert await imaging.read_upload_limited(upload, limit=2000) == b"\xff" * 2000
+    await upload.seek(0)
+    with pytest.raises(HTTPException) as rejected:
+        await imaging.read_upload_limited(upload, limit=1999)
+    assert rejected.value.status_code == 413
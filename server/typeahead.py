@@ -0,0 +1,226 @@
+# server/typeahead.py
+# In-memory prefix index behind GET /plants/suggest (search-box autocomplete).
+#
+# Every word start of a plant's common name, scientific name and uses becomes a key
+# ("holy basil", "basil", "ocimum tenuiflorum", "tenuiflorum", "medicinal", ...),
+# folded to lower case without accents (NFKD + casefold), so "tul", "Tulsi" and
+# "túl" all match. Keys are partitioned by match kind (common name, scientific name,
+# name word, use); per kind, distinct keys live in one sorted list with plant ids in
+# flat arrays. A lookup is a bisect plus a short, bounded forward scan per kind, best
+# kind first, so plenty of use or word matches never crowd out a name match.
+#
+# The index is loaded in the background at startup and reloaded every
+# TYPEAHEAD_RELOAD_SECONDS (and after bulk imports), so plants written by other
+# workers or pods show up within one interval. create_plant adds its plant at once.
+# Until the first load finishes, suggestions come from a name-prefix SQL query.
+import asyncio
+import logging
+import os
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from sqlalchemy import text
+
+from .database import async_session
+
+logger = logging.getLogger(__name__)
+
+TYPEAHEAD_RELOAD_SECONDS = float(os.getenv("TYPEAHEAD_RELOAD_SECONDS", "300"))
+TYPEAHEAD_RETRY_SECONDS = 10 # After a failed load
+SCAN_LIMIT = 200 # Matching references examined per match kind before ranking
+
+# Match kinds, best first
+COMMON_NAME, SCIENTIFIC_NAME, NAME_WORD, USE = KINDS = range(4)
+
+_WORD = re.compile(r"\w+")
+
+LOAD_QUERY = text("SELECT plant_id, common_name, scientific_name, uses FROM plants;")
+
+
+def fold(value: str) -> str:
+    # "Tulsí  (Holy-Basil)" -> "tulsi holy basil"
+    if not value.isascii():
+        decomposed = unicodedata.normalize("NFKD", value)
+        value = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_WORD.findall(value.casefold()))
+
+
+def _word_starts(folded: str):
+    # "holy basil leaf" -> "holy basil leaf", "basil leaf", "leaf"
+    yield folded
+    for position, ch in enumerate(folded):
+        if ch == " ":
+            yield folded[position + 1:]
+
+
+def _plant_keys(common_name, scientific_name, uses):
+    keys = {}
+    for name, kind in ((common_name, COMMON_NAME), (scientific_name, SCIENTIFIC_NAME)):
+        if not name:
+            continue
+        for position, key in enumerate(_word_starts(fold(name))):
+            kind_here = kind if position == 0 else NAME_WORD
+            if key and kind_here < keys.get(key, USE + 1):
+                keys[key] = kind_here
+    for use in uses or ():
+        for key in _word_starts(fold(use or "")):
+            if key and key not in keys:
+                keys[key] = USE
+    return keys.items()
+
+
+class PrefixIndex:
+    # Per match kind, each distinct key is stored once and its plant ids are
+    # plant_ids[kind][offsets[kind][i]:offsets[kind][i + 1]], so a use term shared by
+    # thousands of plants costs one string plus 8 bytes per plant. Plants added after
+    # the build go to a small sorted delta that is searched alongside and folded in by
+    # the next load.
+    def __init__(self):
+        self._keys = [[] for _ in KINDS] # Sorted distinct folded keys
+        self._offsets = [array("q", [0]) for _ in KINDS]
+        self._plant_ids = [array("q") for _ in KINDS]
+        self._added_keys = [[] for _ in KINDS] # Delta: sorted (key, plant_id) pairs from add()
+        self._plants = {} # plant_id -> (common_name, scientific_name)
+
+    @classmethod
+    def build(cls, rows):
+        # rows: (plant_id, common_name, scientific_name, uses)
+        index = cls()
+        postings = [{} for _ in KINDS]
+        for plant_id, common_name, scientific_name, uses in rows:
+            index._plants[plant_id] = (common_name, scientific_name)
+            for key, kind in _plant_keys(common_name, scientific_name, uses):
+                postings[kind].setdefault(key, []).append(plant_id)
+        for kind in KINDS:
+            keys = index._keys[kind] = sorted(postings[kind])
+            for key in keys:
+                index._plant_ids[kind].extend(postings[kind][key])
+                index._offsets[kind].append(len(index._plant_ids[kind]))
+        return index
+
+    def add(self, plant_id, common_name, scientific_name, uses):
+        if plant_id in self._plants:
+            return
+        self._plants[plant_id] = (common_name, scientific_name)
+        for key, kind in _plant_keys(common_name, scientific_name, uses):
+            insort(self._added_keys[kind], (key, plant_id))
+
+    def _matches(self, prefix: str, kind: int):
+        # Yields plant ids with a `kind` key starting with prefix, at most SCAN_LIMIT from each part
+        keys, offsets, plant_ids = self._keys[kind], self._offsets[kind], self._plant_ids[kind]
+        position = bisect_left(keys, prefix)
+        scanned = 0
+        while position < len(keys) and scanned < SCAN_LIMIT and keys[position].startswith(prefix):
+            chunk = plant_ids[offsets[position]:min(offsets[position + 1], offsets[position] + SCAN_LIMIT - scanned)]
+            scanned += len(chunk)
+            yield from chunk
+            position += 1
+
+        added = self._added_keys[kind]
+        position = bisect_left(added, (prefix,))
+        end = min(position + SCAN_LIMIT, len(added))
+        while position < end and added[position][0].startswith(prefix):
+            yield added[position][1]
+            position += 1
+
+    def suggest(self, query: str, limit: int) -> list:
+        prefix = fold(query)
+        if not prefix:
+            return []
+        best = {} # plant_id -> best match kind
+        for kind in KINDS:
+            if len(best) >= limit:
+                break # Worse kinds rank below every plant found so far
+            for plant_id in self._matches(prefix, kind):
+                best.setdefault(plant_id, kind)
+
+        plants = self._plants
+        ranked = sorted(best.items(), key=lambda item: (item[1], len(plants[item[0]][0]), plants[item[0]][0]))
+        return [
+            {"plant_id": plant_id, "common_name": plants[plant_id][0], "scientific_name": plants[plant_id][1]}
+            for plant_id, _ in ranked[:limit]
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "plants": len(self._plants),
+            "keys": sum(map(len, self._keys)),
+            "refs": sum(map(len, self._plant_ids)),
+            "added_keys": sum(map(len, self._added_keys)),
+        }
+
+
+_index = None # PrefixIndex once loaded
+_pending_adds = [] # create_plant calls during a load, replayed onto the new index
+_loading = False
+_reload_requested = None # asyncio.Event
+_task = None
+
+
+def get_index():
+    return _index
+
+
+def add_plant(plant_id, common_name, scientific_name, uses):
+    if _loading:
+        _pending_adds.append((plant_id, common_name, scientific_name, uses))
+    if _index is not None:
+        _index.add(plant_id, common_name, scientific_name, uses)
+
+
+async def load():
+    global _index, _loading
+    _loading = True
+    try:
+        async with async_session() as db:
+            rows = (await db.execute(LOAD_QUERY)).fetchall()
+        # Building sorts every key; keep it off the event loop
+        index = await asyncio.get_running_loop().run_in_executor(
+            None, PrefixIndex.build, [tuple(row) for row in rows]
+        )
+        for plant in _pending_adds:
+            index.add(*plant)
+        _index = index
+    finally:
+        _pending_adds.clear()
+        _loading = False
+
+
+async def _reload_loop():
+    while True:
+        try:
+            await load()
+            delay = TYPEAHEAD_RELOAD_SECONDS
+        except Exception:
+            logger.exception("Typeahead index load failed")
+            delay = TYPEAHEAD_RETRY_SECONDS
+        try:
+            await asyncio.wait_for(_reload_requested.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        _reload_requested.clear()
+
+
+def start():
+    global _task, _reload_requested
+    if _task is None:
+        _reload_requested = asyncio.Event()
+        _task = asyncio.get_running_loop().create_task(_reload_loop())
+
+
+def request_reload():
+    if _reload_requested is not None:
+        _reload_requested.set()
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None